@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Artifact Store
+
+On-disk cache of rendered HTML and PDF artifacts keyed by a digest of every
+render input plus the renderer version. Files are written atomically
+(temp file + rename in the same directory) so several uvicorn workers can
+share one store, and the store is trimmed least-recently-used once it grows
+past a size cap. Reads bump a file's mtime, which is what eviction orders by. The store
+size is tracked from writes and only rescanned when a write may have pushed
+it past the cap.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional, Union
+
+# Bump when a change to the rendering code alters output for the same inputs
+RENDERER_VERSION = "2"
+
+DEFAULT_ROOT = os.environ.get(
+    "RESUME_ARTIFACT_DIR",
+    os.path.join(tempfile.gettempdir(), "resume-artifacts")
+)
+# 0 disables the store entirely
+DEFAULT_MAX_BYTES = int(os.environ.get("RESUME_ARTIFACT_MAX_BYTES", str(512 * 1024 * 1024)))
+# Eviction trims the store this fraction below its cap, and the store is
+# rescanned (to pick up other workers' writes) after this much of the cap
+# has been written, so a full store is scanned once per that many bytes
+# rather than on every write
+RESCAN_FRACTION = 0.1
+
+
+def _library_version(name: str) -> str:
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return "unknown"
+
+
+class ArtifactStore:
+    """
+    Disk-backed LRU of rendered artifacts addressed by input digest.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        # Size on disk as of the last scan, plus what this process wrote since
+        self._scanned_bytes: Optional[int] = None
+        self._written_since_scan = 0
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def renderer_version(self, kind: str) -> str:
+        """Version string folded into every key for artifacts of ``kind``."""
+        version = self._versions.get(kind)
+        if version is None:
+            parts = [RENDERER_VERSION, f"jinja2={_library_version('jinja2')}"]
+            if kind.startswith("pdf"):
+                parts.append(f"weasyprint={_library_version('weasyprint')}")
+            version = self._versions[kind] = ";".join(parts)
+        return version
+
+    def key(self, kind: str, *inputs: Union[bytes, str, None]) -> str:
+        """
+        Digest ``inputs`` for an artifact of ``kind`` (e.g. "html" or "pdf").
+
+        Each input is length-prefixed so adjacent inputs cannot collide, and
+        None is distinct from empty bytes.
+        """
+        h = hashlib.sha256()
+        h.update(kind.encode('utf-8') + b"\0" + self.renderer_version(kind).encode('utf-8'))
+        for value in inputs:
+            if value is None:
+                h.update(b"\0none")
+                continue
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            h.update(b"\0%d:" % len(value))
+            h.update(value)
+        return h.hexdigest()
+
+    def path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, key: str, ext: str) -> Optional[str]:
+        """Return the stored file's path, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self.path(key, ext)
+        try:
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def read(self, key: str, ext: str) -> Optional[bytes]:
+        """
+        Return the stored file's contents, or None on a miss.
+
+        Another worker may evict the file between lookup and read; that is
+        treated as a miss too.
+        """
+        path = self.get(key, ext)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def delete(self, key: str, ext: str):
+        """Remove a stored file, if present."""
+        if not self.enabled:
+            return
+        try:
+            os.unlink(self.path(key, ext))
+        except FileNotFoundError:
+            pass
+
+    def put(self, key: str, ext: str, data: bytes) -> Optional[str]:
+        """Atomically store ``data`` and return its path (None when disabled)."""
+        if not self.enabled:
+            return None
+        path = self.path(key, ext)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self.writes += 1
+            self._written_since_scan += len(data)
+            rescan = (
+                self._scanned_bytes is None
+                or self._scanned_bytes + self._written_since_scan > self.max_bytes
+                or self._written_since_scan >= self.max_bytes * RESCAN_FRACTION
+            )
+        # Scanning the store is O(files); only do it when this write may have
+        # pushed it over the cap, or enough was written to need a fresh total
+        if rescan:
+            self.evict()
+        return path
+
+    def _entries(self):
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, st.st_size, st.st_mtime_ns
+
+    def usage(self) -> int:
+        """Total bytes currently on disk."""
+        if not self.enabled:
+            return 0
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least-recently-used artifacts until the store is back under its cap."""
+        entries = list(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            self._record_scan(total)
+            return
+        entries.sort(key=lambda e: e[2])
+        low_water = self.max_bytes * (1 - RESCAN_FRACTION)
+        for path, size, _ in entries:
+            if total <= low_water:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+        self._record_scan(total)
+
+    def _record_scan(self, total: int):
+        with self._lock:
+            self._scanned_bytes = total
+            self._written_since_scan = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/write/eviction counters for this process and disk usage."""
+        with self._lock:
+            stats = {
+                "enabled": self.enabled,
+                "root": self.root,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+        stats["bytes"] = self.usage()
+        return stats
+
+
+# Process-wide store used by the API endpoints
+artifact_store = ArtifactStore()
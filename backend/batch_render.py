@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Batch Variant Renderer
+
+Renders one base resume against a directory of overlays and a set of
+templates in a single run. The base YAML is parsed once, then the
+overlay x template product is fanned out over a process pool, writing each
+template's output (HTML, Markdown, ...) and optionally a PDF of every HTML
+variant, plus a manifest.json summary with per-variant timings. Variants
+are listed in job order (base, then overlays by file name, each through
+the templates in the order given), however many workers render them.
+Inputs that would write two variants to the same file are rejected.
+
+This works on files on the server; over HTTP the same base-against-many-
+overlays run is ``POST /generate/pdf-batch-direct``.
+
+Usage:
+    python -m backend.batch_render resumes/base.yaml resumes/overlays output/batch \
+        -t templates/resume.html.j2 -c css/resume-styles.css --pdf
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backend.data_cache import data_cache
+from backend.merge_plan import get_merge_plan
+from backend.render_resume import inject_css, load_resume_data
+from backend.template_cache import get_template
+
+MANIFEST_NAME = "manifest.json"
+# Output extensions that get the CSS injected and can be converted to PDF
+HTML_EXTENSIONS = (".html", ".htm")
+
+# Per-worker state set up once by _init_worker
+_worker_state = {}
+
+
+def find_overlays(overlay_dir: str) -> List[str]:
+    """Return the overlay YAML files in ``overlay_dir`` in a stable order."""
+    paths = [
+        p for p in Path(overlay_dir).iterdir()
+        if p.is_file() and p.suffix.lower() in (".yaml", ".yml")
+    ]
+    return [str(p) for p in sorted(paths)]
+
+
+def template_output_name(template_file: str) -> str:
+    """Output name a template renders to: its file name minus ``.j2`` (HTML if that has no extension)."""
+    name = Path(template_file).name
+    if name.endswith(".j2"):
+        name = name[:-3]
+    return name if Path(name).suffix else f"{name}.html"
+
+
+def is_html_output(name: str) -> bool:
+    return Path(name).suffix.lower() in HTML_EXTENSIONS
+
+
+def variant_name(overlay_file: Optional[str], template_file: str) -> str:
+    """Build the output file name for an overlay/template pair, e.g. ``overlay.resume.md``."""
+    overlay_stem = Path(overlay_file).stem if overlay_file else "base"
+    return f"{overlay_stem}.{template_output_name(template_file)}"
+
+
+def pdf_output_name(name: str) -> str:
+    return f"{Path(name).stem}.pdf"
+
+
+def variant_jobs(
+    overlay_dir: Optional[str],
+    template_files: List[str],
+    include_base: bool = False,
+    pdf: bool = False
+) -> List[Tuple[Optional[str], str]]:
+    """
+    Return the ``(overlay, template)`` pair of every variant in job order.
+
+    Raises:
+        ValueError: two variants would write the same output file (e.g.
+            ``a.yaml`` and ``a.yml``, an overlay named ``base`` next to the
+            base variant, or two templates with the same file name)
+    """
+    overlays = find_overlays(overlay_dir) if overlay_dir else []
+    if include_base:
+        overlays = [None] + overlays
+    jobs = [(overlay, template) for overlay in overlays for template in template_files]
+
+    owners = {}
+    for overlay, template in jobs:
+        name = variant_name(overlay, template)
+        outputs = [name]
+        if pdf and is_html_output(name):
+            outputs.append(pdf_output_name(name))
+        for output in outputs:
+            other = owners.setdefault(output, (overlay, template))
+            if other != (overlay, template):
+                raise ValueError(
+                    f"Variants {other[0] or 'base'} x {other[1]} and {overlay or 'base'} x {template} "
+                    f"would both be written to {output}; rename one of them"
+                )
+    return jobs
+
+
+def _init_worker(base_data, templates: Dict[str, bytes], css_bytes: Optional[bytes]):
+    _worker_state["base_data"] = base_data
+    _worker_state["templates"] = templates
+    _worker_state["css_bytes"] = css_bytes
+
+
+def _render_variant(overlay_file: Optional[str], template_file: str, output_dir: str, pdf: bool) -> dict:
+    """Render a single variant inside a worker and return its manifest entry."""
+    name = variant_name(overlay_file, template_file)
+    entry = {
+        "name": name,
+        "overlay": overlay_file,
+        "template": template_file,
+    }
+    started = time.perf_counter()
+    try:
+        data = _worker_state["base_data"]
+        if overlay_file:
+            with open(overlay_file, 'rb') as f:
+                data = get_merge_plan(f.read()).apply(data)
+
+        template = get_template(_worker_state["templates"][template_file])
+        html = template.render(resume=data)
+        is_html = is_html_output(name)
+        css_bytes = _worker_state["css_bytes"]
+        if css_bytes and is_html:
+            html = inject_css(html, css_bytes)
+
+        output_path = os.path.join(output_dir, name)
+        with open(output_path, 'w') as f:
+            f.write(html)
+        entry["html" if is_html else "output"] = output_path
+        entry["render_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        if pdf and is_html:
+            # Imported lazily so HTML-only batches never load WeasyPrint
+            from backend.html_to_pdf import html_to_pdf
+
+            pdf_started = time.perf_counter()
+            css_content = css_bytes.decode('utf-8', errors='ignore') if css_bytes else None
+            pdf_path = os.path.join(output_dir, pdf_output_name(name))
+            html_to_pdf(html, css_content=css_content, target=pdf_path)
+            entry["pdf"] = pdf_path
+            entry["pdf_ms"] = round((time.perf_counter() - pdf_started) * 1000, 2)
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+
+    entry["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return entry
+
+
+def render_batch(
+    base_file: str,
+    overlay_dir: Optional[str],
+    template_files: List[str],
+    output_dir: str,
+    css_file: Optional[str] = None,
+    pdf: bool = False,
+    include_base: bool = False,
+    workers: Optional[int] = None
+) -> dict:
+    """
+    Render every overlay x template variant of a base resume.
+
+    Args:
+        base_file: Base resume YAML file
+        overlay_dir: Directory of overlay YAML files (may be None with include_base)
+        template_files: Jinja2 template files to render each overlay through
+        output_dir: Directory for the rendered files and manifest.json
+        css_file: Optional CSS file to embed in every variant
+        pdf: Also convert every variant to PDF
+        include_base: Also render the base without any overlay
+        workers: Process pool size (defaults to the CPU count); 1 renders in-process
+
+    Returns:
+        The manifest dict, which is also written to ``output_dir/manifest.json``
+
+    Raises:
+        ValueError: two variants would write the same output file
+    """
+    started = time.perf_counter()
+    jobs = variant_jobs(overlay_dir, template_files, include_base, pdf)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Parse the base once; workers receive the frozen tree instead of the YAML
+    with open(base_file, 'rb') as f:
+        base_bytes = f.read()
+    base_data = data_cache.get(base_bytes, None, load_resume_data)
+
+    templates = {}
+    for template_file in template_files:
+        with open(template_file, 'rb') as f:
+            templates[template_file] = f.read()
+
+    css_bytes = None
+    if css_file:
+        with open(css_file, 'rb') as f:
+            css_bytes = f.read()
+
+    initargs = (base_data, templates, css_bytes)
+    if workers == 1:
+        _init_worker(*initargs)
+        variants = [_render_variant(o, t, output_dir, pdf) for o, t in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=initargs
+        ) as pool:
+            futures = [pool.submit(_render_variant, o, t, output_dir, pdf) for o, t in jobs]
+            # Collected in submission order, so the manifest matches workers=1
+            variants = [future.result() for future in futures]
+
+    manifest = {
+        "base": base_file,
+        "css": css_file,
+        "pdf": pdf,
+        "variants": variants,
+        "succeeded": sum(1 for v in variants if "error" not in v),
+        "failed": sum(1 for v in variants if "error" in v),
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def watch_targets(
+    base_file: str,
+    overlay_dir: Optional[str],
+    template_files: List[str],
+    output_dir: str,
+    css_file: Optional[str] = None,
+    pdf: bool = False,
+    include_base: bool = False
+) -> list:
+    """Build the watch-mode targets for the same variants render_batch produces."""
+    from backend.watch import BuildTarget
+
+    targets = []
+    for overlay, template in variant_jobs(overlay_dir, template_files, include_base, pdf):
+        name = variant_name(overlay, template)
+        is_html = is_html_output(name)
+        targets.append(BuildTarget(
+            base=base_file,
+            template=template,
+            html_output=os.path.join(output_dir, name),
+            overlay=overlay,
+            css=css_file if is_html else None,
+            pdf_output=os.path.join(output_dir, pdf_output_name(name)) if pdf and is_html else None
+        ))
+    return targets
+
+
+def main():
+    p = argparse.ArgumentParser(
+        description="Render every overlay x template variant of a base resume."
+    )
+    p.add_argument("base", help="Base resume YAML file")
+    p.add_argument("overlay_dir", help="Directory containing overlay YAML files")
+    p.add_argument("output_dir", help="Directory for rendered variants and manifest.json")
+    p.add_argument(
+        "--template-file", "-t",
+        action="append",
+        help="Jinja2 template file (repeatable, default templates/resume.html.j2)"
+    )
+    p.add_argument(
+        "--css-file", "-c",
+        help="Optional CSS file to embed in every rendered variant"
+    )
+    p.add_argument("--pdf", action="store_true", help="Also generate a PDF for every variant")
+    p.add_argument(
+        "--include-base", action="store_true",
+        help="Also render the base resume without an overlay"
+    )
+    p.add_argument("--workers", "-j", type=int, help="Number of worker processes")
+    p.add_argument(
+        "--watch", "-w", action="store_true",
+        help="Keep running and rebuild only the variants whose inputs changed"
+    )
+    args = p.parse_args()
+    template_files = args.template_file or ["templates/resume.html.j2"]
+
+    try:
+        variant_jobs(args.overlay_dir, template_files, args.include_base, args.pdf)
+    except ValueError as e:
+        p.error(str(e))
+
+    if args.watch:
+        from backend.watch import watch
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        watch(watch_targets(
+            args.base, args.overlay_dir, template_files, args.output_dir,
+            css_file=args.css_file, pdf=args.pdf, include_base=args.include_base
+        ))
+        return
+
+    manifest = render_batch(
+        base_file=args.base,
+        overlay_dir=args.overlay_dir,
+        template_files=template_files,
+        output_dir=args.output_dir,
+        css_file=args.css_file,
+        pdf=args.pdf,
+        include_base=args.include_base,
+        workers=args.workers
+    )
+
+    for variant in manifest["variants"]:
+        if "error" in variant:
+            print(f"FAILED {variant['name']}: {variant['error']}")
+        else:
+            print(f"Rendered {variant['name']} in {variant['total_ms']} ms")
+    print(
+        f"Rendered {manifest['succeeded']} variant(s), {manifest['failed']} failed, "
+        f"in {manifest['total_ms']} ms; manifest at {os.path.join(args.output_dir, MANIFEST_NAME)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+CSS Custom Property Resolver
+
+Inlines ``var(--name)`` references for renderers that do not support CSS
+custom properties well. Custom properties are collected from every
+top-level ``:root`` rule, then the stylesheet is rewritten in a single
+left-to-right scan that resolves nested references and
+``var(--name, fallback)`` forms. Comments and quoted strings are skipped in
+both passes. Results are memoized by stylesheet digest.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Maximum number of resolved stylesheets kept per process
+RESOLVED_CACHE_SIZE = int(os.environ.get("RESUME_CSS_VARS_CACHE_SIZE", "32"))
+
+# Comments, quoted strings and the structural characters the scanners react to
+_BLOCK_TOKENS = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[{}]', re.S)
+_VAR_TOKENS = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\bvar\(', re.S | re.I)
+_PAREN_TOKENS = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[(),]', re.S)
+_DECL_TOKENS = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[();]', re.S)
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_DECLARATION = re.compile(r'^\s*(--[\w-]+)\s*:\s*(.*?)\s*$', re.S)
+
+_resolved = OrderedDict()
+_resolved_lock = threading.Lock()
+
+
+def _is_root_selector(prelude: str) -> bool:
+    selectors = _COMMENT.sub('', prelude).split(',')
+    return any(s.strip() == ':root' for s in selectors)
+
+
+def _split_declarations(body: str):
+    """
+    Split a rule body on ``;``, skipping semicolons inside comments, quoted
+    strings and parentheses (e.g. unquoted ``url(data:...;base64,...)``).
+    Comments are dropped from the returned declarations.
+    """
+    declarations = []
+    parts = []
+    depth = 0
+    pos = 0
+    for match in _DECL_TOKENS.finditer(body):
+        token = match.group()
+        if token.startswith('/*'):
+            parts.append(body[pos:match.start()])
+            pos = match.end()
+        elif token == '(':
+            depth += 1
+        elif token == ')':
+            depth = max(depth - 1, 0)
+        elif token == ';' and depth == 0:
+            parts.append(body[pos:match.start()])
+            declarations.append(''.join(parts))
+            parts = []
+            pos = match.end()
+    parts.append(body[pos:])
+    declarations.append(''.join(parts))
+    return declarations
+
+
+def collect_custom_properties(css: str) -> Dict[str, str]:
+    """
+    Return the custom properties declared in top-level ``:root`` rules.
+
+    Later declarations win, matching the cascade for equal specificity.
+    Rules nested in at-rules (e.g. ``@media``) are conditional and ignored.
+    """
+    properties = {}
+    depth = 0
+    prelude_start = 0
+    block_start = None
+    for match in _BLOCK_TOKENS.finditer(css):
+        token = match.group()
+        if token == '{':
+            if depth == 0 and _is_root_selector(css[prelude_start:match.start()]):
+                block_start = match.end()
+            depth += 1
+        elif token == '}':
+            depth = max(depth - 1, 0)
+            if depth == 0:
+                if block_start is not None:
+                    for declaration in _split_declarations(css[block_start:match.start()]):
+                        decl = _DECLARATION.match(declaration)
+                        if decl:
+                            properties[decl.group(1)] = decl.group(2)
+                    block_start = None
+                prelude_start = match.end()
+    return properties
+
+
+def _split_var_arguments(css: str, start: int):
+    """
+    Parse the arguments of a ``var(`` whose opening parenthesis ends at ``start``.
+
+    Returns ``(name, fallback, end)`` where ``fallback`` is None when absent
+    and ``end`` is the index just past the closing parenthesis, or None if
+    the parenthesis is never closed.
+    """
+    depth = 1
+    comma = None
+    for match in _PAREN_TOKENS.finditer(css, start):
+        token = match.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth == 0:
+                end = match.start()
+                if comma is None:
+                    return css[start:end].strip(), None, match.end()
+                return css[start:comma].strip(), css[comma + 1:end].strip(), match.end()
+        elif token == ',' and depth == 1 and comma is None:
+            comma = match.start()
+    return None
+
+
+class _Resolver:
+    def __init__(self, properties: Dict[str, str]):
+        self.properties = properties
+        self.values: Dict[str, Optional[str]] = {}
+        self.resolving = []
+        self.cyclic = set()
+
+    def value(self, name: str) -> Optional[str]:
+        """Fully resolved value of a custom property, or None if undefined or cyclic."""
+        if name in self.values:
+            return self.values[name]
+        if name not in self.properties:
+            return None
+        if name in self.resolving:
+            # Every property on the cycle is invalid, as in the CSS spec
+            self.cyclic.update(self.resolving[self.resolving.index(name):])
+            return None
+        self.resolving.append(name)
+        resolved = self.substitute(self.properties[name])
+        self.resolving.pop()
+        if name in self.cyclic:
+            resolved = None
+        self.values[name] = resolved
+        return resolved
+
+    def substitute(self, text: str) -> str:
+        """Replace every resolvable ``var()`` in ``text`` in one scan."""
+        out = []
+        pos = 0
+        scan = 0
+        while True:
+            match = _VAR_TOKENS.search(text, scan)
+            if match is None:
+                break
+            if match.group()[0] in '/"\'':
+                scan = match.end()
+                continue
+            parsed = _split_var_arguments(text, match.end())
+            if parsed is None:
+                break
+            name, fallback, end = parsed
+            replacement = self.value(name)
+            if replacement is None and fallback is not None:
+                replacement = self.substitute(fallback)
+            if replacement is not None:
+                out.append(text[pos:match.start()])
+                out.append(replacement)
+                pos = end
+            scan = end
+        out.append(text[pos:])
+        return ''.join(out)
+
+
+def resolve_css_variables(css: str) -> str:
+    """
+    Return ``css`` with every resolvable ``var()`` reference inlined.
+
+    References to undefined properties without a fallback are left as-is.
+    Results are memoized by the SHA-256 of ``css``.
+    """
+    key = hashlib.sha256(css.encode('utf-8')).hexdigest()
+    with _resolved_lock:
+        cached = _resolved.get(key)
+        if cached is not None:
+            _resolved.move_to_end(key)
+            return cached
+
+    resolved = _Resolver(collect_custom_properties(css)).substitute(css)
+    with _resolved_lock:
+        _resolved[key] = resolved
+        while len(_resolved) > RESOLVED_CACHE_SIZE:
+            _resolved.popitem(last=False)
+    return resolved
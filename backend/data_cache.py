@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Resume Data Cache
+
+Content-addressed cache of parsed and merged resume data trees. Entries are
+keyed by the digests of the base and overlay YAML bytes and evicted
+least-recently-used once their estimated memory footprint exceeds a byte
+budget. Cached trees are frozen so they can be shared safely between
+requests.
+
+Merged trees share every subtree their overlay leaves untouched with the
+cached base tree, so an overlay entry is only charged for the nodes it
+owns; the shared ones are charged to the base entry once.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import AbstractSet, Any, Callable, Optional, Tuple
+
+DEFAULT_MAX_BYTES = int(os.environ.get("RESUME_DATA_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+
+def _readonly(*args, **kwargs):
+    raise TypeError("cached resume data is read-only; copy it with thaw() before modifying")
+
+
+class FrozenDict(dict):
+    """A dict that refuses in-place modification."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """A list that refuses in-place modification."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __iadd__ = __imul__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists into their read-only variants."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Recursively convert a (possibly frozen) tree back into plain dicts and lists."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _walk(value: Any, shared: AbstractSet[int] = frozenset()) -> Tuple[int, set]:
+    """
+    Sum the footprint of ``value`` and collect the ids of its containers.
+
+    Containers whose id is in ``shared`` are neither counted nor walked.
+    """
+    seen = set()
+    containers = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (dict, list, tuple)):
+            if id(obj) in shared:
+                continue
+            containers.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return total, containers
+
+
+def estimate_size(value: Any, shared: AbstractSet[int] = frozenset()) -> int:
+    """
+    Estimate the memory footprint of a data tree in bytes.
+
+    Subtrees whose container id is in ``shared`` (owned by another cached
+    tree) are skipped without being walked.
+    """
+    return _walk(value, shared)[0]
+
+
+def data_key(base_bytes: bytes, overlay_bytes: Optional[bytes] = None) -> Tuple[str, Optional[str]]:
+    """Return the cache key for a base/overlay pair."""
+    base_digest = hashlib.sha256(base_bytes).hexdigest()
+    overlay_digest = hashlib.sha256(overlay_bytes).hexdigest() if overlay_bytes else None
+    return (base_digest, overlay_digest)
+
+
+class ResumeDataCache:
+    """
+    Thread-safe LRU of frozen resume data trees bounded by estimated memory.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        base_bytes: bytes,
+        overlay_bytes: Optional[bytes],
+        build: Callable[[bytes, Optional[bytes]], Any]
+    ) -> Any:
+        """
+        Return the merged data tree for ``base_bytes``/``overlay_bytes``.
+
+        Args:
+            base_bytes: Raw base YAML
+            overlay_bytes: Raw overlay YAML, or None
+            build: Called as ``build(base_bytes, overlay_bytes)`` on a miss to
+                   produce the merged tree; the result is frozen before caching
+        """
+        key = data_key(base_bytes, overlay_bytes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        data = freeze(build(base_bytes, overlay_bytes))
+        self.put(key, data)
+        return data
+
+    def put(self, key: Tuple[str, Optional[str]], data: Any):
+        """
+        Insert a frozen data tree under ``key`` and evict down to the budget.
+
+        A merged tree is charged only for the nodes it does not share with
+        its cached base, and is walked only that far.
+        """
+        shared = frozenset()
+        if key[1] is not None:
+            with self._lock:
+                base = self._entries.get((key[0], None))
+            if base is not None:
+                # Holding ``base`` keeps its ids valid while we compare
+                shared = base[2]
+        size, containers = _walk(data, shared)
+        with self._lock:
+            if size > self.max_bytes:
+                # Larger than the whole cache; serve it without keeping it
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            # Base entries keep their container ids for their overlays' put()
+            self._entries[key] = (data, size, containers if key[1] is None else frozenset())
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached trees and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current memory usage."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide cache used by render_html
+data_cache = ResumeDataCache()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Per-Stage Executors
+
+Routes each kind of blocking work the API does to its own pool so a slow
+stage cannot starve the others or the event loop: HTML rendering
+(YAML + Jinja2) runs on a thread pool, resume parsing (pdfplumber, spaCy,
+PyResParser) on a process pool, and PDF rendering on the warm WeasyPrint
+pool in backend.pdf_pool. Every stage reports its queue depth and timings.
+
+Jobs wait for a free worker in the API process and then have a timeout.
+A process pool whose worker crashed (e.g. a spaCy OOM) or whose job timed
+out is replaced, and the other jobs it was running are retried on the new
+workers. A thread stage cannot stop a timed-out job; the caller gets the
+timeout and the thread finishes in the background.
+
+Configuration (environment variables), each as ``thread:N`` or ``process:N``:
+    RESUME_EXECUTOR_RENDER  HTML rendering, ``thread:N`` only (default: thread:4)
+    RESUME_EXECUTOR_PARSE   Resume parsing (default: process:2)
+
+Per-job timeouts in seconds (a /parse/resumes shard is one job):
+    RESUME_EXECUTOR_RENDER_TIMEOUT  (default: 30)
+    RESUME_EXECUTOR_PARSE_TIMEOUT   (default: 300)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from backend.pdf_pool import pdf_pool
+
+STAGE_DEFAULTS = {
+    "render": "thread:4",
+    "parse": "process:2",
+}
+STAGE_TIMEOUTS = {
+    "render": "30",
+    "parse": "300",
+}
+EXECUTOR_KINDS = ("thread", "process")
+# Attempts per job when its process pool breaks underneath it
+STAGE_MAX_ATTEMPTS = 2
+# Stages that drive generators (iterate_in_stage), which cannot be sent to a process
+THREAD_ONLY_STAGES = ("render",)
+
+
+def parse_stage_config(value: str, stage: Optional[str] = None):
+    """Parse ``thread:N`` / ``process:N`` for ``stage`` into ``(kind, workers)``."""
+    kind, _, workers = value.strip().partition(":")
+    kind = kind.lower()
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor kind '{kind}'; expected one of {', '.join(EXECUTOR_KINDS)}")
+    if kind == "process" and stage in THREAD_ONLY_STAGES:
+        raise ValueError(f"The {stage} stage streams from a generator and needs thread:N, not '{value}'")
+    return kind, max(int(workers or "1"), 1)
+
+
+class StageTimeout(Exception):
+    """Raised when a stage job exceeds the stage's timeout."""
+
+
+class StageExecutor:
+    """
+    Thread or process pool for one stage, with queue depth and timing counters.
+    """
+
+    def __init__(self, name: str, kind: str, workers: int, timeout: Optional[float] = None):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._initializer = None
+        self._lock = threading.Lock()
+        # One slot per worker, bound to the event loop that created it
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.replacements = 0
+        self.retried = 0
+        self.total_ms = 0.0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=self._initializer
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix=f"{self.name}-stage",
+                        initializer=self._initializer
+                    )
+            return self._executor
+
+    def start(self, initializer=None):
+        """
+        Spawn the workers now, running ``initializer`` in each, instead of
+        on the first job.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._initializer = initializer
+        executor = self._get_executor()
+        for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def _replace(self, executor: Executor):
+        # Retire a broken or stuck process pool; the next job starts a fresh
+        # one (with the same initializer). Jobs still on it fail with
+        # BrokenProcessPool and are retried by _run_job.
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.replacements += 1
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+    def _worker_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run_job(self, call):
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, STAGE_MAX_ATTEMPTS + 1):
+            executor = self._get_executor()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, call), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                if self.kind == "process":
+                    self._replace(executor)
+                raise StageTimeout(f"{self.name} stage job exceeded {self.timeout:g}s")
+            except BrokenProcessPool:
+                # A worker died (OOM, crash) or was terminated after another
+                # job's timeout; start fresh workers and try again
+                self._replace(executor)
+                if attempt == STAGE_MAX_ATTEMPTS:
+                    raise
+                self.retried += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run ``fn(*args, **kwargs)`` on this stage's pool and await the result.
+
+        Raises:
+            StageTimeout: the job ran longer than the stage's timeout
+        """
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            # Wait for a worker here so the timeout only counts running time
+            async with self._worker_slots():
+                result = await self._run_job(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Return configuration, queue depth and job counters."""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.workers, 0),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "replacements": self.replacements,
+            "retried": self.retried,
+            "avg_ms": round(self.total_ms / self.completed, 2) if self.completed else 0,
+        }
+
+
+def _build_executors() -> Dict[str, StageExecutor]:
+    stages = {}
+    for name, default in STAGE_DEFAULTS.items():
+        kind, workers = parse_stage_config(os.environ.get(f"RESUME_EXECUTOR_{name.upper()}", default), name)
+        timeout = float(os.environ.get(f"RESUME_EXECUTOR_{name.upper()}_TIMEOUT", STAGE_TIMEOUTS[name]))
+        stages[name] = StageExecutor(name, kind, workers, timeout)
+    return stages
+
+
+# Process-wide stage executors used by the API endpoints
+executors = _build_executors()
+
+
+async def run_in_stage(stage: str, fn, *args, **kwargs):
+    """
+    Run blocking ``fn`` on the executor for ``stage``.
+
+    Functions sent to a process stage must be importable module-level
+    functions, and their arguments and results picklable.
+    """
+    return await executors[stage].run(fn, *args, **kwargs)
+
+
+async def iterate_in_stage(stage: str, iterator):
+    """
+    Drive a blocking iterator on the executor for ``stage``, one item per hop.
+
+    Only for thread stages: the iterator itself never leaves this process.
+    """
+    if executors[stage].kind != "thread":
+        raise ValueError(f"Cannot iterate on the {stage} stage: it runs on a process pool")
+    done = object()
+    while True:
+        item = await run_in_stage(stage, next, iterator, done)
+        if item is done:
+            break
+        yield item
+
+
+def executor_stats() -> dict:
+    """Return queue depth and counters for every stage, including PDF rendering."""
+    stats = {name: executor.stats() for name, executor in executors.items()}
+    stats["pdf"] = pdf_pool.stats()
+    return stats
+
+
+def shutdown_executors():
+    """Stop every stage's workers."""
+    for executor in executors.values():
+        executor.shutdown()
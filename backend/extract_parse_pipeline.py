@@ -4,7 +4,8 @@ extract_parse_pipeline.py
 
 Enhanced pipeline to extract and parse key fields from PDF resumes using PyResParser,
 with pre-processing steps to improve ATS accuracy:
-- PDF text extraction with pdfplumber + Tesseract OCR fallback
+- PDF text extraction with pdfplumber + Tesseract OCR fallback, done once per
+  upload and shared by every later stage (see backend.resume_document)
 - Cleaning to remove headers/footers and non-ASCII artifacts
 - Delegation of field extraction to PyResParser
 - Custom scoring based on skills, JD keywords, and experience
@@ -12,89 +13,226 @@ with pre-processing steps to improve ATS accuracy:
 import os
 import sys
 import re
-import pdfplumber
-from PIL import Image
-import spacy
-import spacy.matcher.matcher as matcher_mod
+import threading
 import traceback
+from contextlib import contextmanager
 from typing import Dict, List, Any, Optional
 
-# 1. Patch spaCy to load the proper model for PyResParser
-_original_spacy_load = spacy.load
-
-def _patched_spacy_load(name, **kwargs):
-    if os.path.basename(name) == "pyresparser":
-        return _original_spacy_load("en_core_web_lg", **kwargs)
-    return _original_spacy_load(name, **kwargs)
-
-spacy.load = _patched_spacy_load
-
-# 2. Patch Matcher for legacy signatures in PyResParser
-class PatchedMatcher(matcher_mod.Matcher):
-    def add(self, name, *args, **kwargs):
-        patterns = [arg for arg in args if isinstance(arg, list)]
-        return super().add(name, patterns, **kwargs)
-
-matcher_mod.Matcher = PatchedMatcher
-import spacy.matcher
-spacy.matcher.Matcher = PatchedMatcher
-
-# 3. Import PyResParser with fallback
-try:
-    from pyresparser import ResumeParser as PRP
-    PYRESPARSER_AVAILABLE = True
-except ImportError:
-    print("Warning: PyResParser not available, using fallback implementation")
-    PYRESPARSER_AVAILABLE = False
+from backend.nlp_batch import DEFAULT_BATCH_SIZE, pipe_docs
+from backend.nlp_models import nlp_models
+from backend.resume_document import ExtractedDocument, extract_document
+
+# The NLP stack (spaCy, PyResParser) and pdfplumber are heavy to import, so
+# they are loaded by load_parsing_stack() on first use rather than at import
+# time; processes that never parse a resume never pay for them.
+PYRESPARSER_AVAILABLE = None
+PRP = None
+_stack_lock = threading.Lock()
+# spaCy models PyResParser loads, and the components it never reads: it uses
+# tokens, POS tags and noun chunks from the general model, and only the
+# entities from the model standing in for its custom one
+PYRESPARSER_GENERAL_MODEL = "en_core_web_sm"
+PYRESPARSER_CUSTOM_MODEL = "en_core_web_lg"
+PYRESPARSER_MODELS = {
+    PYRESPARSER_GENERAL_MODEL: ("lemmatizer", "ner"),
+    PYRESPARSER_CUSTOM_MODEL: ("tagger", "parser", "attribute_ruler", "lemmatizer"),
+}
+
+# Document (and Docs from a batched nlp.pipe run) PyResParser is currently
+# reading in this thread, if any
+_prp_input = threading.local()
+
+
+class _FallbackPRP:
+    """Simple fallback used when PyResParser isn't available"""
+    def __init__(self, path):
+        self.path = path
+        
+    def get_extracted_data(self):
+        # Return basic dummy data when PyResParser isn't available
+        return {
+            "name": "Unknown",
+            "email": [],
+            "mobile_number": [],
+            "skills": [],
+            "college_name": [],
+            "degree": [],
+            "designation": [],
+            "experience": [],
+            "company_names": [],
+            "total_experience": 0,
+            "extracted_using": "fallback_implementation"
+        }
+
+
+def load_parsing_stack():
+    """
+    Import spaCy and PyResParser and apply the compatibility patches.
     
-    # Simple fallback implementation
-    class PRP:
-        def __init__(self, path):
-            self.path = path
-            
-        def get_extracted_data(self):
-            # Return basic dummy data when PyResParser isn't available
-            return {
-                "name": "Unknown",
-                "email": [],
-                "mobile_number": [],
-                "skills": [],
-                "college_name": [],
-                "degree": [],
-                "designation": [],
-                "experience": [],
-                "company_names": [],
-                "total_experience": 0,
-                "extracted_using": "fallback_implementation"
-            }
+    Idempotent and thread-safe; called by ResumeParser on first use, or at
+    start-up by deployments that want to pay the cost up front.
+    """
+    global PYRESPARSER_AVAILABLE, PRP
+    with _stack_lock:
+        if PRP is not None:
+            return
+        
+        import spacy
+        import spacy.matcher
+        import spacy.matcher.matcher as matcher_mod
+        
+        # 1. Patch Matcher for legacy signatures in PyResParser
+        class PatchedMatcher(matcher_mod.Matcher):
+            def add(self, name, *args, **kwargs):
+                patterns = [arg for arg in args if isinstance(arg, list)]
+                return super().add(name, patterns, **kwargs)
+        
+        matcher_mod.Matcher = PatchedMatcher
+        spacy.matcher.Matcher = PatchedMatcher
+        
+        # 2. Import PyResParser with fallback
+        try:
+            from pyresparser import ResumeParser as parser_class
+            PYRESPARSER_AVAILABLE = True
+        except ImportError:
+            print("Warning: PyResParser not available, using fallback implementation")
+            PYRESPARSER_AVAILABLE = False
+            parser_class = _FallbackPRP
+        else:
+            # 3. Load PyResParser's models through the shared registry
+            _patch_pyresparser_spacy(spacy)
+            _patch_pyresparser_input()
+        PRP = parser_class
+
+
+def preload_parsing_models():
+    """Load the parsing stack and every spaCy model PyResParser uses, up front"""
+    load_parsing_stack()
+    if PYRESPARSER_AVAILABLE:
+        for name, exclude in PYRESPARSER_MODELS.items():
+            nlp_models.get(name, exclude=exclude)
+
+
+class _PyResParserSpacy:
+    """
+    Stand-in for the ``spacy`` module inside PyResParser's own modules.
+
+    Its ``load`` returns the shared, trimmed models from the registry (and
+    the large general model for PyResParser's bundled custom one); every
+    other attribute is spaCy's. spaCy itself is left unpatched, so loads
+    anywhere else in the process get the full pipelines they ask for.
+    """
+    
+    def __init__(self, spacy):
+        self._spacy = spacy
+    
+    def load(self, name, **kwargs):
+        if os.path.basename(str(name)) == "pyresparser":
+            name = PYRESPARSER_CUSTOM_MODEL
+        elif kwargs:
+            # Callers asking for a specific configuration get their own copy
+            return self._spacy.load(name, **kwargs)
+        return _PrecomputedPipeline(nlp_models.get(name, exclude=PYRESPARSER_MODELS.get(name, ())))
+    
+    def __getattr__(self, name):
+        return getattr(self._spacy, name)
+
+
+def _patch_pyresparser_spacy(spacy):
+    """Point the ``spacy`` name in PyResParser's modules at _PyResParserSpacy"""
+    import pyresparser
+    from pyresparser import resume_parser, utils
+    
+    proxy = _PyResParserSpacy(spacy)
+    for module in (pyresparser, resume_parser, utils):
+        if getattr(module, "spacy", None) is spacy:
+            module.spacy = proxy
+
+
+def _patch_pyresparser_input():
+    """
+    Route PyResParser's own PDF reads to the document being parsed.
+    
+    PyResParser calls ``utils.extract_text`` and ``utils.get_number_of_pages``
+    on the path it is given, decoding the PDF a second time. Inside
+    _pyresparser_input() both are answered from the extracted document;
+    any other call still goes to the originals.
+    """
+    from pyresparser import utils
+    
+    original_extract_text = utils.extract_text
+    original_page_count = utils.get_number_of_pages
+    
+    def _current(path) -> Optional[ExtractedDocument]:
+        document = getattr(_prp_input, "document", None)
+        return document if document is not None and path == document.path else None
+    
+    def extract_text(path, extension):
+        document = _current(path)
+        return document.text if document else original_extract_text(path, extension)
+    
+    def get_number_of_pages(path):
+        document = _current(path)
+        return document.page_count if document else original_page_count(path)
+    
+    utils.extract_text = extract_text
+    utils.get_number_of_pages = get_number_of_pages
+
+
+class _PrecomputedPipeline:
+    """
+    spaCy pipeline as handed to PyResParser: returns the Doc a batched
+    nlp.pipe run already produced for the text, if any, instead of running
+    the pipeline again.
+    """
+    
+    def __init__(self, nlp):
+        self._nlp = nlp
+    
+    def __call__(self, text, **kwargs):
+        docs = getattr(_prp_input, "docs", None)
+        doc = docs.get((id(self._nlp), text)) if docs else None
+        return doc if doc is not None else self._nlp(text, **kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(self._nlp, name)
+
+
+@contextmanager
+def _pyresparser_input(document: ExtractedDocument, docs: Optional[dict] = None):
+    """Make PyResParser read ``document`` (and ``docs``) instead of decoding the PDF again"""
+    _prp_input.document = document
+    _prp_input.docs = docs
+    try:
+        yield
+    finally:
+        _prp_input.document = None
+        _prp_input.docs = None
 
 class ResumeParser:
     def __init__(self, path: str, skill_list: list, jd_keywords: list = None):
         self.path = path
         self.skill_list = set(s.lower() for s in skill_list) if skill_list else set()
         self.jd_keywords = set(k.lower() for k in (jd_keywords or [])) if jd_keywords else set()
+        self._document: Optional[ExtractedDocument] = None
+        # (id(model), text) -> Doc, filled in by parse_resume_files
+        self._nlp_docs: Optional[dict] = None
+        load_parsing_stack()
+
+    def document(self) -> ExtractedDocument:
+        """Extract the PDF once (pdfplumber with OCR fallback) and reuse the result"""
+        if self._document is None:
+            try:
+                self._document = extract_document(self.path)
+            except Exception as e:
+                print(f"Error extracting text: {e}")
+                print(traceback.format_exc())
+                self._document = ExtractedDocument(self.path, [])
+        return self._document
 
     def extract_text(self) -> str:
         """Extract text from PDF using pdfplumber with fallback to OCR if needed"""
-        pages = []
-        try:
-            with pdfplumber.open(self.path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text() or ""
-                    if not text.strip() and hasattr(page, 'to_image'):
-                        # If no text extracted, try OCR if available
-                        try:
-                            import pytesseract
-                            img = page.to_image()
-                            text = pytesseract.image_to_string(img.original)
-                        except ImportError:
-                            print("OCR not available (pytesseract not installed)")
-                    pages.append(text)
-            return "\n".join(pages)
-        except Exception as e:
-            print(f"Error extracting text: {e}")
-            print(traceback.format_exc())
-            return ""
+        return self.document().text
             
     def extract_basic_info(self, text: str) -> Dict[str, Any]:
         """Basic parsing when PyResParser isn't available"""
@@ -195,7 +333,8 @@ class ResumeParser:
             # Delegate field extraction to PyResParser or fallback
             if PYRESPARSER_AVAILABLE:
                 try:
-                    pr = PRP(self.path)
+                    with _pyresparser_input(self.document(), self._nlp_docs):
+                        pr = PRP(self.path)
                     data = pr.get_extracted_data() or {}
                     data['parsed_with'] = "PyResParser"
                 except Exception as e:
@@ -214,6 +353,7 @@ class ResumeParser:
             
             # Add metadata
             data['file_path'] = os.path.basename(self.path)
+            data['extraction'] = self.document().timings()
             
             # Ensure skills are present (even if empty)
             if 'skills' not in data:
@@ -260,10 +400,60 @@ class ResumeParser:
                 "error": str(e),
                 "score": 0,
                 "skills": [],
-                "extracted_text": self.extract_text()
+                # Never re-extract here: the document is already in memory
+                "extracted_text": self._document.text if self._document else ""
             }
 
 
+def parse_resume_file(pdf_path: str, skills_list: List[str], jd_keywords: List[str] = None) -> Dict[str, Any]:
+    """Parse one resume PDF; a module-level entry point for worker pools."""
+    return ResumeParser(pdf_path, skills_list, jd_keywords).parse()
+
+
+def _pipe_pyresparser_docs(parsers: List[ResumeParser], batch_size: int, n_process: Optional[int]):
+    """Run every resume through PyResParser's models with nlp.pipe, ahead of parsing"""
+    general = nlp_models.get(PYRESPARSER_GENERAL_MODEL, exclude=PYRESPARSER_MODELS[PYRESPARSER_GENERAL_MODEL])
+    custom = nlp_models.get(PYRESPARSER_CUSTOM_MODEL, exclude=PYRESPARSER_MODELS[PYRESPARSER_CUSTOM_MODEL])
+    
+    # The texts PyResParser feeds each model: whitespace-normalised text to
+    # the general one, the raw text to the custom one
+    raw = [parser.extract_text() for parser in parsers]
+    normalised = [" ".join(text.split()) for text in raw]
+    general_docs = pipe_docs(general, normalised, batch_size=batch_size, n_process=n_process)
+    custom_docs = pipe_docs(custom, raw, batch_size=batch_size, n_process=n_process)
+    
+    for parser, text, norm, general_doc, custom_doc in zip(parsers, raw, normalised, general_docs, custom_docs):
+        parser._nlp_docs = {(id(general), norm): general_doc, (id(custom), text): custom_doc}
+
+
+def parse_resume_files(
+    pdf_paths: List[str],
+    skills_list: List[str],
+    jd_keywords: List[str] = None,
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Parse many resume PDFs, running the spaCy models over them in batches.
+    
+    Results are in the order of ``pdf_paths``. Resumes are handled
+    ``batch_size`` at a time, so only one batch of Docs is held in memory.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    load_parsing_stack()
+    results = []
+    for start in range(0, len(pdf_paths), batch_size):
+        parsers = [ResumeParser(path, skills_list, jd_keywords) for path in pdf_paths[start:start + batch_size]]
+        if PYRESPARSER_AVAILABLE:
+            try:
+                _pipe_pyresparser_docs(parsers, batch_size, n_process)
+            except Exception as e:
+                # Each resume is then processed on its own inside PyResParser
+                print(f"Batched NLP failed: {e}, parsing one resume at a time")
+        results.extend(parser.parse() for parser in parsers)
+    return results
+
+
 def main(pdf_path: str, skills_list: List[str] = None, jd_keywords: List[str] = None):
     """Command-line entry point for resume parsing"""
     if not os.path.exists(pdf_path):
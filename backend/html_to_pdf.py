@@ -6,42 +6,279 @@ This script converts an HTML resume to a PDF file with preserved formatting.
 """
 
 import argparse
+import hashlib
 import os
 import tempfile
 import io
+import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
 
-def html_to_pdf(html_content: str, css_content: str = None) -> bytes:
+# Add the parent directory to the path so `python backend/html_to_pdf.py` can import the backend module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.css_vars import resolve_css_variables
+from backend.resource_fetcher import url_fetcher
+
+# Base CSS to ensure proper formatting
+BASE_CSS = """
+        @page {
+            size: letter;
+            margin: 0.5in;
+        }
+        """
+
+# Smallest content scale fit_pages will try, and how many halvings it makes
+FIT_MIN_SCALE = float(os.environ.get("RESUME_FIT_MIN_SCALE", "0.6"))
+FIT_STEPS = int(os.environ.get("RESUME_FIT_STEPS", "6"))
+
+# Image settings for optimize mode
+PDF_JPEG_QUALITY = int(os.environ.get("RESUME_PDF_JPEG_QUALITY", "75"))
+PDF_IMAGE_DPI = int(os.environ.get("RESUME_PDF_IMAGE_DPI", "150"))
+
+# Date written into deterministic PDFs; honours the reproducible-builds
+# SOURCE_DATE_EPOCH convention
+PDF_SOURCE_DATE_EPOCH = int(os.environ.get("SOURCE_DATE_EPOCH", "0"))
+
+# Maximum number of parsed stylesheets kept per process
+STYLESHEET_CACHE_SIZE = int(os.environ.get("RESUME_STYLESHEET_CACHE_SIZE", "32"))
+
+_font_config = None
+_font_config_lock = threading.Lock()
+_base_stylesheet = None
+_stylesheets = OrderedDict()
+_stylesheet_lock = threading.Lock()
+stylesheet_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+class PDFFallbackOutput(Exception):
+    """
+    Raised instead of returning the plain-text FPDF fallback when a
+    deterministic PDF was requested: the fallback depends on whether
+    WeasyPrint happened to fail, so it must not be cached as the output for
+    these inputs. The degraded PDF is in ``pdf_bytes``.
+    """
+
+    def __init__(self, message: str, pdf_bytes: bytes):
+        super().__init__(message, pdf_bytes)
+        self.pdf_bytes = pdf_bytes
+
+    def __str__(self) -> str:
+        return self.args[0]
+
+def get_font_config():
+    """
+    Return the process-wide WeasyPrint font configuration.
+    
+    Font discovery runs once per process, and fonts loaded from @font-face
+    rules stay registered for later renders.
+    """
+    global _font_config
+    with _font_config_lock:
+        if _font_config is None:
+            try:
+                from weasyprint.text.fonts import FontConfiguration
+            except ImportError:
+                # WeasyPrint < 53
+                from weasyprint.fonts import FontConfiguration
+            _font_config = FontConfiguration()
+        return _font_config
+
+def get_base_stylesheet():
+    """
+    Return the parsed @page stylesheet, built once per process.
+    """
+    global _base_stylesheet
+    if _base_stylesheet is None:
+        from weasyprint import CSS
+        _base_stylesheet = CSS(string=BASE_CSS, font_config=get_font_config(), url_fetcher=url_fetcher)
+    return _base_stylesheet
+
+def get_stylesheet(processed_css: str):
+    """
+    Return a parsed WeasyPrint stylesheet for ``processed_css``.
+    
+    Parsed CSS objects are kept in a bounded LRU keyed by the SHA-256 of the
+    processed CSS, so repeat renders with the same stylesheet skip parsing.
+    """
+    from weasyprint import CSS
+    
+    key = hashlib.sha256(processed_css.encode('utf-8')).hexdigest()
+    with _stylesheet_lock:
+        stylesheet = _stylesheets.get(key)
+        if stylesheet is not None:
+            _stylesheets.move_to_end(key)
+            stylesheet_stats["hits"] += 1
+            return stylesheet
+        stylesheet_stats["misses"] += 1
+    
+    # Parsed against the shared font configuration so @font-face fonts are
+    # registered once, not per render
+    stylesheet = CSS(string=processed_css, font_config=get_font_config(), url_fetcher=url_fetcher)
+    with _stylesheet_lock:
+        _stylesheets[key] = stylesheet
+        while len(_stylesheets) > STYLESHEET_CACHE_SIZE:
+            _stylesheets.popitem(last=False)
+            stylesheet_stats["evictions"] += 1
+    return stylesheet
+
+def stylesheet_cache_stats() -> dict:
+    """
+    Return hit/miss/eviction counters for the parsed stylesheet cache.
+    """
+    with _stylesheet_lock:
+        return dict(stylesheet_stats, size=len(_stylesheets), max_size=STYLESHEET_CACHE_SIZE)
+
+def render_cache_stats() -> dict:
+    """
+    Return the counters of every cache html_to_pdf uses in this process.
+    """
+    return {
+        "stylesheets": stylesheet_cache_stats(),
+        "resources": url_fetcher.stats(),
+        "font_config_loaded": _font_config is not None,
+    }
+
+def _weasyprint_major():
+    # Checked by version so callers in the API process never import WeasyPrint
+    try:
+        from importlib.metadata import version
+        return int(version("weasyprint").split(".")[0])
+    except Exception:
+        return None
+
+def _pin_metadata(document, html_content: str, css_content: str, options: dict) -> dict:
+    """
+    Make ``document`` write byte-identical PDFs for identical inputs.
+    
+    The creation and modification dates are pinned to SOURCE_DATE_EPOCH and
+    the PDF file identifier is derived from a digest of the inputs instead
+    of being left to the writer. Returns the write options to use.
+    """
+    from datetime import datetime, timezone
+    
+    pinned = datetime.fromtimestamp(PDF_SOURCE_DATE_EPOCH, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    document.metadata.created = pinned
+    document.metadata.modified = pinned
+    
+    digest = hashlib.sha256()
+    for part in (html_content, css_content or "", repr(sorted(options.items()))):
+        digest.update(part.encode('utf-8') + b"\0")
+    identifier = digest.hexdigest()[:32].encode('ascii')
+    
+    major = _weasyprint_major()
+    key = "identifier" if major is not None and major < 59 else "pdf_identifier"
+    return dict(options, **{key: identifier})
+
+def optimize_options() -> dict:
+    """
+    WeasyPrint options for size-optimized output.
+    
+    Images are recompressed as JPEG at PDF_JPEG_QUALITY and downsampled to
+    PDF_IMAGE_DPI. Font subsetting and stream compression are already
+    WeasyPrint's defaults, so only the image handling changes.
+    """
+    major = _weasyprint_major()
+    if major is not None and major < 59:
+        # Older releases only expose the coarse optimize_size switch, and
+        # only as a render() argument (see _write_options)
+        return {"optimize_size": ("fonts", "images")}
+    return {
+        "optimize_images": True,
+        "jpeg_quality": PDF_JPEG_QUALITY,
+        "dpi": PDF_IMAGE_DPI,
+    }
+
+def _write_options(options: dict) -> dict:
+    """The subset of render ``options`` that Document.write_pdf also accepts."""
+    # Before WeasyPrint 59, write_pdf has no optimize_size parameter
+    return {key: value for key, value in options.items() if key != "optimize_size"}
+
+def _render_scaled(html, css_objects, page_size, scale: float, options: dict):
+    """
+    Lay out ``html`` with its content scaled by ``scale``.
+    
+    The page box is enlarged by 1/scale and the finished document is written
+    with ``zoom=scale``, so the output keeps the original paper size while
+    text, spacing and margins all shrink together. Sizing the page instead
+    of fonts works for the px-based resume stylesheets, which a root
+    font-size change would not reach.
+    """
+    from weasyprint import CSS
+    
+    width, height = page_size
+    fit_css = CSS(string=f"@page {{ size: {width / scale:.3f}px {height / scale:.3f}px; }}")
+    return html.render(stylesheets=css_objects + [fit_css], font_config=get_font_config(), **options)
+
+def _render_fitted(html, css_objects, max_pages: int, options: dict):
+    """
+    Find the largest scale at which ``html`` fits on ``max_pages`` pages.
+    
+    Only layout runs during the search (``render()`` produces no PDF bytes),
+    and the HTML and stylesheets are parsed once for all attempts. Returns
+    the laid-out document and its scale; if even FIT_MIN_SCALE overflows,
+    the document at that scale is returned.
+    """
+    font_config = get_font_config()
+    document = html.render(stylesheets=css_objects, font_config=font_config, **options)
+    if len(document.pages) <= max_pages:
+        return document, 1.0
+    
+    first = document.pages[0]
+    page_size = (first.width, first.height)
+    
+    best = _render_scaled(html, css_objects, page_size, FIT_MIN_SCALE, options)
+    best_scale = FIT_MIN_SCALE
+    if len(best.pages) > max_pages:
+        print(f"Content needs {len(best.pages)} pages even at scale {FIT_MIN_SCALE:g}")
+        return best, best_scale
+    
+    low, high = FIT_MIN_SCALE, 1.0
+    for _ in range(FIT_STEPS):
+        scale = (low + high) / 2
+        document = _render_scaled(html, css_objects, page_size, scale, options)
+        if len(document.pages) <= max_pages:
+            best, best_scale = document, scale
+            low = scale
+        else:
+            high = scale
+    return best, best_scale
+
+def html_to_pdf(
+    html_content: str,
+    css_content: str = None,
+    fit_pages: int = None,
+    optimize: bool = False,
+    deterministic: bool = False,
+    target=None
+) -> Optional[bytes]:
     """
     Convert HTML content to PDF bytes with WeasyPrint, preserving all styling.
     
     Args:
         html_content: The HTML content to convert
         css_content: Optional CSS content to apply (in addition to any embedded CSS)
+        fit_pages: Shrink the content uniformly until it fits on this many pages
+        optimize: Recompress and downsample images (see optimize_options)
+        deterministic: Pin dates and the document ID so identical inputs give identical bytes
+        target: Optional file path or binary file object; the PDF is written
+            straight to it and None is returned instead of the bytes
+    
+    Raises:
+        PDFFallbackOutput: WeasyPrint failed with ``deterministic`` set; the
+            exception carries the FPDF fallback instead of it being returned
     """
     try:
         # Use WeasyPrint directly - we've installed compatible versions
-        from weasyprint import HTML, CSS
-        import re
+        from weasyprint import HTML
         
         # Process the CSS to replace variables and add explicit styling
         processed_css = css_content
         if processed_css:
-            # Process CSS to handle variables and pseudo-elements
-            # First, look for CSS variable definitions
-            root_vars = re.search(r':root\s*{([^}]+)}', processed_css)
-            css_vars = {}
-            
-            if root_vars:
-                var_matches = re.findall(r'--([a-zA-Z0-9-]+)\s*:\s*([^;]+);', root_vars.group(1))
-                for var_name, var_value in var_matches:
-                    css_vars[f'--{var_name}'] = var_value.strip()
-                    print(f"Found CSS variable: --{var_name} = {var_value.strip()}")
-            
-            # Replace CSS variables with their actual values
-            for var_name, var_value in css_vars.items():
-                processed_css = processed_css.replace(f'var({var_name})', var_value)
-                print(f"Replaced var({var_name}) with {var_value}")
+            # Inline CSS variables (nested references and fallbacks included)
+            # in one pass; memoized per stylesheet
+            processed_css = resolve_css_variables(processed_css)
             
             # Add specific handling for the section-header before/after
             section_header_styles = """
@@ -69,30 +306,35 @@ def html_to_pdf(html_content: str, css_content: str = None) -> bytes:
             
             processed_css = processed_css + "\n" + section_header_styles
         
-        # Base CSS to ensure proper formatting
-        base_css = """
-        @page {
-            size: letter;
-            margin: 0.5in;
-        }
-        """
-        
-        # Create CSS objects array
-        css_objects = [CSS(string=base_css)]
+        # Create CSS objects array; both stylesheets come from the parse caches
+        css_objects = [get_base_stylesheet()]
         
         # Add explicitly provided CSS if available
         if processed_css:
             print(f"Adding processed CSS ({len(processed_css)} bytes)")
-            css_objects.append(CSS(string=processed_css))
+            css_objects.append(get_stylesheet(processed_css))
         
-        # Create an HTML object from content
-        html = HTML(string=html_content)
+        # Create an HTML object from content; images and linked stylesheets
+        # go through the caching fetcher
+        html = HTML(string=html_content, url_fetcher=url_fetcher)
         
         # Convert to PDF bytes directly with all stylesheets
         print(f"Converting HTML to PDF with {len(css_objects)} CSS objects")
-        pdf_bytes = html.write_pdf(stylesheets=css_objects)
+        options = optimize_options() if optimize else {}
+        if fit_pages:
+            document, scale = _render_fitted(html, css_objects, fit_pages, options)
+            print(f"Fitted to {len(document.pages)} page(s) at scale {scale:.3f}")
+        else:
+            document = html.render(stylesheets=css_objects, font_config=get_font_config(), **options)
+            scale = 1
+        
+        write_options = options
+        if deterministic:
+            write_options = _pin_metadata(document, html_content, css_content, options)
+        pdf_bytes = document.write_pdf(target, zoom=scale, **_write_options(write_options))
         
-        print(f"Generated PDF: {len(pdf_bytes)} bytes")
+        if target is None:
+            print(f"Generated PDF: {len(pdf_bytes)} bytes")
         return pdf_bytes
     
     except Exception as e:
@@ -126,12 +368,23 @@ def html_to_pdf(html_content: str, css_content: str = None) -> bytes:
             output = pdf.output(dest='S')
             
             if isinstance(output, str):
-                return output.encode('latin1')
+                output = output.encode('latin1')
             elif isinstance(output, bytearray):
-                return bytes(output)
-            else:
+                output = bytes(output)
+            
+            if deterministic:
+                raise PDFFallbackOutput(f"WeasyPrint failed ({e}); only the fallback PDF is available", output)
+            if target is None:
                 return output
+            if hasattr(target, 'write'):
+                target.write(output)
+            else:
+                with open(target, 'wb') as f:
+                    f.write(output)
+            return None
                 
+        except PDFFallbackOutput:
+            raise
         except Exception as fallback_error:
             print(f"Fallback error: {fallback_error}", file=sys.stderr)
             print(traceback.format_exc(), file=sys.stderr)
@@ -181,6 +434,9 @@ def main():
     parser = argparse.ArgumentParser(description='Convert HTML resume to PDF')
     parser.add_argument('html_path', help='Path to the HTML file')
     parser.add_argument('pdf_path', help='Path to save the PDF file')
+    parser.add_argument('--fit-pages', type=int, help='Scale the content down until it fits on this many pages')
+    parser.add_argument('--optimize', action='store_true', help='Optimize the PDF for size by recompressing images')
+    parser.add_argument('--deterministic', action='store_true', help='Produce byte-identical output for identical input')
     
     args = parser.parse_args()
     
@@ -188,12 +444,19 @@ def main():
     with open(args.html_path, 'r') as f:
         html_content = f.read()
     
-    # Convert to PDF
-    pdf_bytes = html_to_pdf(html_content)
-    
-    # Write to file
-    with open(args.pdf_path, 'wb') as f:
-        f.write(pdf_bytes)
+    # Convert to PDF, written straight to the output file
+    try:
+        html_to_pdf(
+            html_content,
+            fit_pages=args.fit_pages,
+            optimize=args.optimize,
+            deterministic=args.deterministic,
+            target=args.pdf_path
+        )
+    except PDFFallbackOutput as e:
+        print(f"Warning: {e}; writing the non-deterministic fallback")
+        with open(args.pdf_path, 'wb') as f:
+            f.write(e.pdf_bytes)
     
     print(f"Successfully generated {args.pdf_path}")
 
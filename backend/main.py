@@ -1,37 +1,199 @@
 # backend/main.py
 # Minimal FastAPI wrapper around your existing scripts: render_resume.py and html_to_pdf.py
 
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import HTMLResponse, Response, FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import HTMLResponse, Response, FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
+import asyncio
+import itertools
+import re
 import tempfile
 import os
 from typing import List, Optional
+from urllib.parse import quote
 
 # Import your existing functions
-from backend.render_resume import render_html
-from backend.html_to_pdf import html_to_pdf
+from backend.render_resume import render_html, render_html_stream
+from backend.artifact_store import artifact_store
+from backend.data_cache import data_cache
+from backend.merge_plan import plan_cache
+from backend.precompiled_templates import warm_template_cache
+from backend.template_cache import template_cache
+from backend.html_to_pdf import stylesheet_cache_stats
+from backend.resource_fetcher import url_fetcher
+from backend.pdf_pool import PDFPoolBusy, PDFRenderTimeout, pdf_pool
+from backend.executors import executor_stats, executors, iterate_in_stage, run_in_stage, shutdown_executors
+from backend.pdf_artifacts import cache_headers, cached_pdf_artifact, pdf_etag, render_pdf_artifact, size_headers
+from backend.pdf_batch import BATCH_FORMATS, BatchJob, merge_available, render_merged, stream_zip, unique_pdf_names
 # Import the resume parser
-from backend.extract_parse_pipeline import ResumeParser
+# Cheap to import: the parsing stack itself loads on first use
+from backend.extract_parse_pipeline import parse_resume_file, parse_resume_files, preload_parsing_models
+from backend.nlp_models import model_stats
+from backend.ocr import ocr_engine
+from backend.resume_document import extraction_ocr_stats, shutdown_page_pool
 
 
+# Deployment profile: "full" serves everything and loads the parsing stack
+# on first use, "render" serves only the generation endpoints and never
+# loads it, "parse" preloads it and leaves the PDF pool idle until needed
+API_PROFILES = ("full", "render", "parse")
+API_PROFILE = os.environ.get("RESUME_API_PROFILE", "full").lower()
+if API_PROFILE not in API_PROFILES:
+    raise ValueError(f"Unknown RESUME_API_PROFILE '{API_PROFILE}'; expected one of {', '.join(API_PROFILES)}")
+
 app = FastAPI(title="Resume Generation API")
 app.add_middleware(
   CORSMiddleware,
   allow_origins=["*"],  # Allow all origins while testing
   allow_methods=["*"],
   allow_headers=["*"],
+  # Let the frontend read the optimize-mode size report and batch failures
+  expose_headers=[
+      "ETag", "X-PDF-Original-Bytes", "X-PDF-Optimized-Bytes", "X-PDF-Saved-Percent",
+      "X-PDF-Batch-Succeeded", "X-PDF-Batch-Failed", "X-PDF-Batch-Failed-Names"
+  ],
 )
 
+@app.on_event("startup")
+def load_precompiled_templates():
+    # Uploads of the bundled templates hit the template cache on first use
+    print(f"Loaded {warm_template_cache()} precompiled template(s)")
+
+@app.on_event("startup")
+def start_pdf_pool():
+    # Spawn and warm the WeasyPrint workers before the first request
+    if API_PROFILE == "parse":
+        return
+    pdf_pool.start()
+    print(f"Started PDF render pool with {pdf_pool.size} worker(s)")
+
+@app.on_event("startup")
+def preload_parsing_stack():
+    # Parse-heavy deployments load spaCy/PyResParser and their models in
+    # every parse worker up front
+    if API_PROFILE != "parse":
+        return
+    executors["parse"].start(initializer=preload_parsing_models)
+    print(f"Loaded the parsing stack in {executors['parse'].workers} parse worker(s)")
+
+@app.on_event("shutdown")
+def stop_pdf_pool():
+    pdf_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_executors():
+    shutdown_executors()
+    shutdown_page_pool()
+    ocr_engine.shutdown()
+
+def _pdf_pool_error(e: Exception) -> Response:
+    """Map PDF pool admission/timeout errors to 503/504 responses."""
+    status_code = 503 if isinstance(e, PDFPoolBusy) else 504
+    print(f"PDF render rejected: {e}")
+    return Response(
+        content=f"Failed to generate PDF: {e}",
+        status_code=status_code,
+        media_type="text/plain",
+        headers={"Retry-After": "1"} if status_code == 503 else None
+    )
+
 class HTMLContent(BaseModel):
     html: str
+    optimize: bool = False
+
+class HTMLBatch(BaseModel):
+    html: List[str]
+    names: Optional[List[str]] = None
+    format: str = "zip"
+    optimize: bool = False
 
 class ParseResumeRequest(BaseModel):
     skill_list: List[str]
     jd_keywords: Optional[List[str]] = None
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header covers ``etag``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    tags = [tag.strip() for tag in header.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+def _extract_style_css(html: str) -> str:
+    """Combine the contents of every <style> tag in ``html``."""
+    css_matches = re.findall(r'<style[^>]*>(.*?)</style>', html, re.DOTALL | re.IGNORECASE)
+    css_content = "\n".join(css_matches)
+    print(f"Extracted {len(css_content)} bytes of CSS from {len(css_matches)} style tags")
+    return css_content
+
+async def _batch_response(jobs: List[BatchJob], output_format: str, optimize: bool = False) -> Response:
+    """
+    Stream a batch of PDF jobs as a zip archive, or return one merged PDF.
+
+    The zip reports failed documents in its manifest.json. The merged PDF
+    can only be sent once complete, so it reports them in the
+    X-PDF-Batch-Failed / X-PDF-Batch-Failed-Names headers, and fails with a
+    500 when no document rendered.
+    """
+    if output_format not in BATCH_FORMATS:
+        return Response(
+            content=f"Unknown batch format '{output_format}'; expected one of {', '.join(BATCH_FORMATS)}",
+            status_code=400,
+            media_type="text/plain"
+        )
+    if output_format == "merged" and not merge_available():
+        return Response(
+            content="Merged output requires the pypdf package; request format=zip instead",
+            status_code=501,
+            media_type="text/plain"
+        )
+    if pdf_pool.in_flight >= pdf_pool.capacity:
+        return _pdf_pool_error(PDFPoolBusy("PDF render queue is full"))
+    
+    if output_format == "merged":
+        merged = await render_merged(jobs, optimize=optimize)
+        failed = [entry for entry in merged.documents if "error" in entry]
+        if merged.pdf is None:
+            return Response(
+                content="Failed to generate any PDF in the batch:\n" + "\n".join(
+                    f"{entry['name']}: {entry['error']}" for entry in failed
+                ),
+                status_code=500,
+                media_type="text/plain"
+            )
+        headers = {
+            "Content-Disposition": "attachment; filename=resumes.pdf",
+            "X-PDF-Batch-Succeeded": str(len(jobs) - len(failed)),
+            "X-PDF-Batch-Failed": str(len(failed)),
+        }
+        if failed:
+            headers["X-PDF-Batch-Failed-Names"] = ",".join(quote(entry["name"]) for entry in failed)
+        return Response(content=merged.pdf, media_type="application/pdf", headers=headers)
+    return StreamingResponse(
+        stream_zip(jobs, optimize=optimize),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=resumes.zip"}
+    )
+
+def _store_when_complete(chunks, key: str, ext: str):
+    """
+    Yield streamed chunks and store the full artifact once the stream finishes.
+
+    Driven on the render stage (iterate_in_stage), so the store write and
+    any eviction it triggers stay off the event loop.
+    """
+    rendered = []
+    for chunk in chunks:
+        rendered.append(chunk)
+        yield chunk
+    artifact_store.put(key, ext, "".join(rendered).encode('utf-8'))
+
 @app.post("/generate/html", response_class=HTMLResponse)
 async def generate_html(
     base_yaml: UploadFile = File(...),
@@ -41,7 +203,8 @@ async def generate_html(
 ):
     """
     Render HTML from base YAML, overlay YAML, and Jinja2 template.
-    Returns raw HTML for preview or further processing.
+    Returns raw HTML for preview or further processing, streamed to the
+    client as the template renders.
     """
     base_bytes = await base_yaml.read()
     template_bytes = await template.read()
@@ -53,61 +216,67 @@ async def generate_html(
     css_bytes = None
     if css_file:
         css_bytes = await css_file.read()
-        css_content = css_bytes.decode('utf-8')
         print(f"CSS file provided: {css_file.filename}, size: {len(css_bytes)} bytes")
-        print(f"CSS content preview: {css_content[:200]}...")
     
-    # Call your existing Jinja2 renderer
-    html = render_html(base_bytes, overlay_bytes, template_bytes, css_bytes=css_bytes)
+    # Serve a previously rendered copy straight from disk
+    key = artifact_store.key("html", base_bytes, overlay_bytes, template_bytes, css_bytes)
+    cached_html = await run_in_threadpool(artifact_store.read, key, "html")
+    if cached_html is not None:
+        return Response(content=cached_html, media_type="text/html")
     
-    # Print a snippet of the HTML to inspect
-    print(f"Generated HTML: {len(html)} bytes total")
+    # Stream the Jinja2 render; the CSS goes out as its own chunk before </head>
+    chunks = render_html_stream(base_bytes, overlay_bytes, template_bytes, css_bytes=css_bytes)
     
-    # Check if CSS was actually included in the HTML
-    import re
-    css_tags = re.findall(r'<style[^>]*>(.*?)</style>', html, re.DOTALL | re.IGNORECASE)
-    total_css_length = sum(len(css) for css in css_tags)
+    # Pull the first chunk now so YAML/template errors still fail the request
+    # instead of surfacing after a 200 has been sent; rendering runs on the
+    # render stage so the event loop stays free
+    first = await run_in_stage("render", next, chunks, "")
     
-    print(f"Found {len(css_tags)} style tags in the generated HTML with {total_css_length} total bytes of CSS")
-    
-    if css_bytes and total_css_length < len(css_bytes):
-        print("WARNING: CSS may not have been fully included in the HTML output!")
-    
-    if len(html) > 500:
-        print(f"HTML snippet: {html[:500]}...")
-    else:
-        print(f"HTML: {html}")
-        
-    return HTMLResponse(content=html)
+    return StreamingResponse(
+        iterate_in_stage("render", _store_when_complete(itertools.chain([first], chunks), key, "html")),
+        media_type="text/html"
+    )
 
 @app.post("/generate/pdf")
-async def generate_pdf(payload: HTMLContent):
+async def generate_pdf(payload: HTMLContent, request: Request):
     """
     Convert HTML string to PDF bytes.
-    Accepts a JSON body: { "html": "<your html>" }
-    Returns application/pdf response.
+    Accepts a JSON body: { "html": "<your html>", "optimize": false }
+    Returns application/pdf response. With "optimize" the PDF is optimized
+    for size and X-PDF-*-Bytes headers report its size (and the saving
+    when the unoptimized PDF is cached).
+    The output is deterministic, so responses carry a strong ETag and a
+    matching If-None-Match is answered with 304 without rendering.
     """
     try:
-        # Extract the CSS content from the HTML
-        import re
-        
-        # Look for CSS in style tags
-        css_pattern = r'<style[^>]*>(.*?)</style>'
-        css_matches = re.findall(css_pattern, payload.html, re.DOTALL | re.IGNORECASE)
+        # The CSS is derived from the HTML, so the HTML alone identifies the PDF
+        key = artifact_store.key("pdf", payload.html)
+        etag = pdf_etag(key, optimize=payload.optimize)
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
         
-        # Combine all CSS found
-        css_content = "\n".join(css_matches)
+        cached = await run_in_threadpool(cached_pdf_artifact, key, optimize=payload.optimize)
+        if cached:
+            return Response(
+                content=cached.data,
+                media_type="application/pdf",
+                headers={"ETag": etag, **size_headers(cached)}
+            )
         
-        print(f"Extracted {len(css_content)} bytes of CSS from {len(css_matches)} style tags")
+        # Extract the CSS content from the HTML
+        css_content = _extract_style_css(payload.html)
         
         # Generate PDF with the explicitly extracted CSS
-        pdf_bytes = html_to_pdf(payload.html, css_content=css_content)
+        artifact = await render_pdf_artifact(key, payload.html, css_content, optimize=payload.optimize)
         
-        # Convert to bytes if it's a bytearray
-        if isinstance(pdf_bytes, bytearray):
-            pdf_bytes = bytes(pdf_bytes)
-            
-        return Response(content=pdf_bytes, media_type="application/pdf")
+        # Send the rendered bytes as-is; the stored copy is only for later hits
+        return Response(
+            content=artifact.data,
+            media_type="application/pdf",
+            headers={**cache_headers(artifact, etag), **size_headers(artifact)}
+        )
+    except (PDFPoolBusy, PDFRenderTimeout) as e:
+        return _pdf_pool_error(e)
     except Exception as e:
         # Log the error
         import traceback
@@ -122,14 +291,17 @@ async def generate_pdf(payload: HTMLContent):
 
 @app.post("/generate/pdf-direct", response_class=FileResponse)
 async def generate_pdf_direct(
+    request: Request,
     base_yaml: UploadFile = File(...),
     template: UploadFile = File(...),
     overlay_yaml: UploadFile = File(None),
-    css_file: UploadFile = File(None)
+    css_file: UploadFile = File(None),
+    optimize: bool = Form(False)
 ):
     """
     Direct PDF generation from YAML, template, and CSS.
     This bypasses the HTML step and generates the PDF directly.
+    Set ``optimize`` to optimize the PDF for size.
     """
     try:
         # Read all input files
@@ -148,8 +320,22 @@ async def generate_pdf_direct(
                 css_preview = css_bytes.decode('utf-8', errors='ignore')[:100]
                 print(f"CSS preview: {css_preview}...")
         
+        key = artifact_store.key("pdf-direct", base_bytes, overlay_bytes, template_bytes, css_bytes)
+        etag = pdf_etag(key, optimize=optimize)
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        pdf_headers = {"Content-Disposition": "attachment; filename=resume.pdf"}
+        cached = await run_in_threadpool(cached_pdf_artifact, key, optimize=optimize)
+        if cached:
+            return Response(
+                content=cached.data,
+                media_type="application/pdf",
+                headers={**pdf_headers, "ETag": etag, **size_headers(cached)}
+            )
+        
         # Generate HTML first
-        html = render_html(base_bytes, overlay_bytes, template_bytes, css_bytes=css_bytes)
+        html = await run_in_stage("render", render_html, base_bytes, overlay_bytes, template_bytes, css_bytes=css_bytes)
         
         # Get the CSS content from the HTML
         import re
@@ -157,23 +343,18 @@ async def generate_pdf_direct(
         if css_bytes:
             css_content = css_bytes.decode('utf-8', errors='ignore')
         
-        # Create temporary file for the PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as pdf_file:
-            pdf_path = pdf_file.name
-            
-        # Generate PDF
-        pdf_bytes = html_to_pdf(html, css_content=css_content)
+        # Generate PDF; it is stored for later hits
+        artifact = await render_pdf_artifact(key, html, css_content, optimize=optimize)
         
-        # Write PDF to file
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_bytes)
-        
-        # Return the PDF file
-        return FileResponse(
-            pdf_path, 
+        # Return the rendered bytes directly rather than writing and
+        # re-reading a file
+        return Response(
+            content=artifact.data,
             media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=resume.pdf"}
+            headers={**pdf_headers, **cache_headers(artifact, etag), **size_headers(artifact)}
         )
+    except (PDFPoolBusy, PDFRenderTimeout) as e:
+        return _pdf_pool_error(e)
     except Exception as e:
         import traceback
         print(f"Error in generate_pdf_direct endpoint: {e}")
@@ -184,6 +365,76 @@ async def generate_pdf_direct(
             media_type="text/plain"
         )
 
+@app.post("/generate/pdf-batch")
+async def generate_pdf_batch(payload: HTMLBatch):
+    """
+    Convert several HTML documents to PDF in one request.
+    Accepts a JSON body:
+    { "html": ["<html>", ...], "names": [...], "format": "zip" | "merged", "optimize": false }
+    Documents render in parallel on the PDF pool and are streamed back as
+    they finish in a zip archive (with a manifest.json), or returned as one
+    merged PDF once all are done.
+    """
+    names = unique_pdf_names(payload.names or [""] * len(payload.html))
+    if len(names) != len(payload.html):
+        return Response(
+            content="names must have one entry per HTML document",
+            status_code=400,
+            media_type="text/plain"
+        )
+    
+    jobs = [
+        # Same key as /generate/pdf, so single and batch renders share artifacts
+        BatchJob(name, html, _extract_style_css(html), artifact_store.key("pdf", html))
+        for name, html in zip(names, payload.html)
+    ]
+    return await _batch_response(jobs, payload.format, optimize=payload.optimize)
+
+@app.post("/generate/pdf-batch-direct")
+async def generate_pdf_batch_direct(
+    base_yaml: UploadFile = File(...),
+    template: UploadFile = File(...),
+    overlay_yamls: List[UploadFile] = File(...),
+    css_file: UploadFile = File(None),
+    format: str = Form("zip"),
+    optimize: bool = Form(False)
+):
+    """
+    Render one PDF per overlay against a single base YAML and template.
+    Each output is named after its overlay file; see /generate/pdf-batch for
+    the response formats.
+    """
+    try:
+        base_bytes = await base_yaml.read()
+        template_bytes = await template.read()
+        
+        css_bytes = None
+        css_content = ""
+        if css_file:
+            css_bytes = await css_file.read()
+            css_content = css_bytes.decode('utf-8', errors='ignore')
+        
+        names = unique_pdf_names([os.path.splitext(o.filename or "")[0] for o in overlay_yamls])
+        jobs = []
+        for name, overlay_yaml in zip(names, overlay_yamls):
+            overlay_bytes = await overlay_yaml.read()
+            # The base YAML and template are parsed once and shared via their caches
+            html = await run_in_stage(
+                "render", render_html, base_bytes, overlay_bytes, template_bytes, css_bytes=css_bytes
+            )
+            key = artifact_store.key("pdf-direct", base_bytes, overlay_bytes, template_bytes, css_bytes)
+            jobs.append(BatchJob(name, html, css_content, key))
+    except Exception as e:
+        import traceback
+        print(f"Error in generate_pdf_batch_direct endpoint: {e}")
+        print(traceback.format_exc())
+        return Response(
+            content=f"Failed to render batch: {e}",
+            status_code=500,
+            media_type="text/plain"
+        )
+    return await _batch_response(jobs, format, optimize=optimize)
+
 @app.post("/parse/resume")
 async def parse_resume(
     resume_file: UploadFile = File(...),
@@ -213,9 +464,8 @@ async def parse_resume(
         
         print(f"Parsing resume {resume_file.filename} with {len(skills)} skills and {len(keywords)} keywords")
         
-        # Parse the resume
-        parser = ResumeParser(pdf_path, skills, keywords)
-        result = parser.parse()
+        # Parse the resume on the parse stage
+        result = await run_in_stage("parse", parse_resume_file, pdf_path, skills, keywords)
         
         # Clean up the temporary file
         os.unlink(pdf_path)
@@ -227,6 +477,53 @@ async def parse_resume(
         print(traceback.format_exc())
         return {"error": str(e)}
 
+@app.post("/parse/resumes")
+async def parse_resumes(
+    resume_files: List[UploadFile] = File(...),
+    skill_list: str = Form(""),
+    jd_keywords: str = Form("")
+):
+    """
+    Parse several resume PDFs at once.
+    
+    The resumes are split across the parse workers, and each worker runs
+    its share through the spaCy models in batches (nlp.pipe) instead of
+    one resume at a time.
+    
+    Returns:
+        JSON list with one result per uploaded file, in upload order
+    """
+    pdf_paths = []
+    try:
+        for resume_file in resume_files:
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                pdf_paths.append(tmp_file.name)
+                tmp_file.write(await resume_file.read())
+        
+        skills = [s.strip() for s in skill_list.split(',')] if skill_list else []
+        keywords = [k.strip() for k in jd_keywords.split(',')] if jd_keywords else []
+        
+        print(f"Parsing {len(pdf_paths)} resumes with {len(skills)} skills and {len(keywords)} keywords")
+        
+        workers = executors["parse"].workers
+        share = max(-(-len(pdf_paths) // workers), 1)
+        shards = await asyncio.gather(*(
+            run_in_stage("parse", parse_resume_files, pdf_paths[start:start + share], skills, keywords)
+            for start in range(0, len(pdf_paths), share)
+        ))
+        results = [result for shard in shards for result in shard]
+        for resume_file, result in zip(resume_files, results):
+            result['file_name'] = resume_file.filename
+        return results
+    except Exception as e:
+        import traceback
+        print(f"Error in parse_resumes endpoint: {e}")
+        print(traceback.format_exc())
+        return {"error": str(e)}
+    finally:
+        for pdf_path in pdf_paths:
+            os.unlink(pdf_path)
+
 @app.post("/process/resume")
 async def process_resume(
     resume_file: UploadFile = File(...),
@@ -262,8 +559,7 @@ async def process_resume(
         
         # Basic resume parsing
         skills = []  # Default empty skill list
-        parser = ResumeParser(resume_path, skills)
-        parse_result = parser.parse()
+        parse_result = await run_in_stage("parse", parse_resume_file, resume_path, skills)
         
         result = {
             "parsed_resume": parse_result,
@@ -282,6 +578,53 @@ async def process_resume(
         print(traceback.format_exc())
         return {"error": str(e)}
 
+@app.get("/parse/models")
+async def parse_models():
+    """
+    Report the spaCy models loaded by a parse worker: load time, memory
+    added and how often each was reused.
+    """
+    return await run_in_stage("parse", model_stats)
+
+@app.get("/parse/ocr")
+async def parse_ocr():
+    """
+    Report OCR cache hits, admission counters and latencies for a parse
+    worker, and for the page-parallel extraction workers it started under
+    ``page_workers``. The tesseract run limit is shared by all of them.
+    """
+    return await run_in_stage("parse", extraction_ocr_stats)
+
+@app.get("/executors/stats")
+async def executors_stats():
+    """
+    Report queue depth and timings for every work stage.
+    """
+    return executor_stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Report hit/miss/eviction counters for the in-process render caches.
+    """
+    return {
+        "templates": template_cache.stats(),
+        "resume_data": data_cache.stats(),
+        "merge_plans": plan_cache.stats(),
+        "artifacts": artifact_store.stats(),
+        "stylesheets": stylesheet_cache_stats(),
+        "resources": url_fetcher.stats(),
+        "pdf_pool": pdf_pool.stats(),
+        "pdf_workers": pdf_pool.worker_cache_stats(),
+    }
+
+if API_PROFILE == "render":
+    # Rendering-only workers do not expose the parsing endpoints at all
+    app.router.routes = [
+        route for route in app.router.routes
+        if not getattr(route, "path", "").startswith(("/parse/", "/process/"))
+    ]
+
 if __name__ == "__main__":
     # Run with: python backend/main.py
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
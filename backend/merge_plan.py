@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Precompiled Overlay Merge Plans
+
+Compiles an overlay dict into a flat list of path operations with its
+``_append``/``_merge`` control keys already resolved, so applying the same
+overlay again only walks the operations instead of re-deriving the merge
+modes at every level. Plans for raw overlay YAML are cached by digest.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+from backend.data_cache import freeze
+
+REPLACE = "replace"
+APPEND = "append"
+RECURSE = "recurse"
+
+DEFAULT_MAX_PLANS = int(os.environ.get("RESUME_MERGE_PLAN_CACHE_SIZE", "256"))
+
+_MISSING = object()
+
+
+class MergeOp(NamedTuple):
+    """
+    One step of a merge plan.
+
+    ``value`` is what gets written at ``path``. For APPEND it is appended when
+    the base holds a list there and written as-is otherwise; for RECURSE it is
+    written as-is when the base does not hold a dict there, otherwise the
+    ``span`` operations that follow are applied to the base dict instead.
+    """
+    path: Tuple[str, ...]
+    kind: str
+    value: Any
+    span: int = 0
+
+
+def _selected(mode, key) -> bool:
+    return (
+        mode is True or
+        (isinstance(mode, list) and key in mode) or
+        (isinstance(mode, dict) and key in mode)
+    )
+
+
+def _compile(overlay: dict, append_mode, merge_mode, prefix: tuple, ops: List[MergeOp]):
+    # Extract control flags - use parent flags if none defined at this level
+    append_mode = overlay.get('_append', append_mode if append_mode is not None else False)
+    merge_mode = overlay.get('_merge', merge_mode if merge_mode is not None else True)
+
+    for k, v in overlay.items():
+        # Skip special control keys
+        if k.startswith('_'):
+            continue
+
+        path = prefix + (k,)
+        if isinstance(v, dict) and _selected(merge_mode, k):
+            index = len(ops)
+            ops.append(None)
+            _compile(v, append_mode, merge_mode, path, ops)
+            ops[index] = MergeOp(path, RECURSE, v, len(ops) - index - 1)
+        elif isinstance(v, list) and _selected(append_mode, k):
+            ops.append(MergeOp(path, APPEND, v))
+        else:
+            ops.append(MergeOp(path, REPLACE, v))
+
+
+class MergePlan:
+    """A compiled overlay that can be applied to any number of bases."""
+
+    def __init__(self, ops: List[MergeOp]):
+        self.ops = ops
+
+    def apply(self, base: dict) -> dict:
+        """
+        Merge the overlay into ``base`` without modifying it.
+
+        Only the dicts along the plan's paths are copied; every other subtree
+        of the result is shared with ``base``.
+        """
+        return self._apply(base, 0, len(self.ops))
+
+    def _apply(self, node: dict, start: int, end: int) -> dict:
+        merged = dict(node)
+        ops = self.ops
+        i = start
+        while i < end:
+            op = ops[i]
+            key = op.path[-1]
+            current = node.get(key, _MISSING)
+            if op.kind is RECURSE:
+                if isinstance(current, dict):
+                    merged[key] = self._apply(current, i + 1, i + 1 + op.span)
+                else:
+                    merged[key] = op.value
+                i += 1 + op.span
+                continue
+            if op.kind is APPEND and isinstance(current, list):
+                merged[key] = list(current) + op.value
+            else:
+                merged[key] = op.value
+            i += 1
+        return merged
+
+    def touched_paths(self, base: Optional[dict] = None) -> List[Tuple[Tuple[str, ...], str]]:
+        """
+        List the base paths this overlay writes, as ``(path, action)`` pairs.
+
+        Without ``base`` every leaf operation of the plan is reported, with
+        RECURSE entries omitted in favour of their children. With ``base`` the
+        actions are resolved against it: ``"add"`` for new keys, ``"append"``
+        or ``"replace"`` for existing ones, and recursion into something that
+        is not a dict is reported as a single ``"replace"``.
+        """
+        touched = []
+        self._touched(base, 0, len(self.ops), touched)
+        return touched
+
+    def _touched(self, node, start: int, end: int, touched: list):
+        ops = self.ops
+        i = start
+        while i < end:
+            op = ops[i]
+            current = node.get(op.path[-1], _MISSING) if isinstance(node, dict) else _MISSING
+            if op.kind is RECURSE:
+                if node is None or isinstance(current, dict):
+                    self._touched(None if node is None else current, i + 1, i + 1 + op.span, touched)
+                else:
+                    touched.append((op.path, "add" if current is _MISSING else REPLACE))
+                i += 1 + op.span
+                continue
+            if node is None:
+                touched.append((op.path, op.kind))
+            elif current is _MISSING:
+                touched.append((op.path, "add"))
+            elif op.kind is APPEND and isinstance(current, list):
+                touched.append((op.path, APPEND))
+            else:
+                touched.append((op.path, REPLACE))
+            i += 1
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __repr__(self):
+        return f"MergePlan({len(self.ops)} ops)"
+
+
+def compile_merge_plan(overlay: dict, parent_append_mode=None, parent_merge_mode=None) -> MergePlan:
+    """Compile an overlay dict into a MergePlan with the same semantics as merge_dict."""
+    ops = []
+    _compile(overlay, parent_append_mode, parent_merge_mode, (), ops)
+    return MergePlan(ops)
+
+
+class MergePlanCache:
+    """Thread-safe LRU of merge plans keyed by the digest of the overlay YAML."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_PLANS):
+        self.max_size = max_size
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, overlay_bytes: bytes) -> MergePlan:
+        """Return the plan for raw overlay YAML, parsing and compiling on a miss."""
+        key = hashlib.sha256(overlay_bytes).hexdigest()
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        # Freeze the overlay so values shared into merged trees stay intact
+        plan = compile_merge_plan(freeze(yaml.safe_load(overlay_bytes)))
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+        return plan
+
+    def clear(self):
+        """Drop all cached plans and reset the counters."""
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            return {
+                "size": len(self._plans),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide cache used by render_html
+plan_cache = MergePlanCache()
+
+
+def get_merge_plan(overlay_bytes: bytes) -> MergePlan:
+    """Return the compiled plan for raw overlay YAML from the process-wide cache."""
+    return plan_cache.get(overlay_bytes)
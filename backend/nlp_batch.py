@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Batched spaCy Inference
+
+Collects texts and runs them through ``nlp.pipe`` in batches instead of
+calling ``nlp(text)`` once per text, so many short texts (job-description
+bullets) or many resumes share the per-call pipeline overhead. Results
+come back in the order the texts were added; identical texts are
+processed once.
+
+Configuration (environment variables):
+    RESUME_NLP_BATCH_SIZE  Texts per nlp.pipe batch (default: 64)
+    RESUME_NLP_N_PROCESS   Processes nlp.pipe fans out to (default: 1)
+"""
+
+import os
+from typing import Iterable, List, Optional
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("RESUME_NLP_BATCH_SIZE", "64"))
+DEFAULT_N_PROCESS = int(os.environ.get("RESUME_NLP_N_PROCESS", "1"))
+
+
+class DocBatch:
+    """
+    Texts waiting to go through one spaCy pipeline together.
+
+    ``add`` returns the position of the text's Doc in the list ``run``
+    returns.
+    """
+
+    def __init__(self, nlp, batch_size: Optional[int] = None, n_process: Optional[int] = None):
+        self.nlp = nlp
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.n_process = n_process or DEFAULT_N_PROCESS
+        self._texts = []
+
+    def add(self, text: str) -> int:
+        self._texts.append(text)
+        return len(self._texts) - 1
+
+    def extend(self, texts: Iterable[str]) -> List[int]:
+        return [self.add(text) for text in texts]
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def run(self) -> list:
+        """Process every collected text and return the Docs in insertion order."""
+        unique = list(dict.fromkeys(self._texts))
+        # nlp.pipe yields in input order, also with n_process > 1
+        docs = dict(zip(unique, self.nlp.pipe(
+            unique,
+            batch_size=self.batch_size,
+            n_process=min(self.n_process, max(len(unique), 1))
+        )))
+        return [docs[text] for text in self._texts]
+
+
+def pipe_docs(nlp, texts: Iterable[str], batch_size: Optional[int] = None, n_process: Optional[int] = None) -> list:
+    """Run ``texts`` through ``nlp.pipe`` and return their Docs in order."""
+    batch = DocBatch(nlp, batch_size=batch_size, n_process=n_process)
+    batch.extend(texts)
+    return batch.run()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+spaCy Model Registry
+
+Loads each spaCy pipeline once per process and hands the same object to
+every caller. PyResParser calls ``spacy.load`` for two models on every
+resume it parses; with PyResParser's ``spacy`` reference routed through
+this registry (see backend.extract_parse_pipeline) those calls return the
+shared models instead of reading several hundred MB from disk per request.
+
+Components the caller does not need are excluded at load time, so they
+take neither time nor memory. The registry records how long each model
+took to load and how much resident memory it added.
+"""
+
+import os
+import resource
+import threading
+import time
+from typing import Iterable, Tuple
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current, but still rises with each model loaded
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded spaCy pipelines, keyed by model name and
+    excluded components.
+    """
+
+    def __init__(self, loader=None):
+        self._loader = loader
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str, exclude: Tuple[str, ...]):
+        loader = self._loader
+        if loader is None:
+            # Not spacy.load: PyResParser's is routed back here
+            from spacy.util import load_model as loader
+        return loader(name, exclude=list(exclude))
+
+    def get(self, name: str, exclude: Iterable[str] = ()):
+        """Return the pipeline ``name`` without ``exclude``, loading it on first use."""
+        key = (name, tuple(sorted(exclude)))
+        with self._lock:
+            nlp = self._models.get(key)
+            if nlp is not None:
+                self._stats[key]["uses"] += 1
+                return nlp
+
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            nlp = self._load(name, key[1])
+            load_ms = (time.perf_counter() - started) * 1000
+            self._models[key] = nlp
+            self._stats[key] = {
+                "model": name,
+                "excluded": list(key[1]),
+                "components": list(getattr(nlp, "pipe_names", [])),
+                "load_ms": round(load_ms, 2),
+                "rss_bytes": max(_rss_bytes() - rss_before, 0),
+                "uses": 1,
+            }
+        print(f"Loaded spaCy model {name} in {load_ms:.0f}ms")
+        return nlp
+
+    def clear(self):
+        """Drop every loaded pipeline."""
+        with self._lock:
+            self._models.clear()
+            self._stats.clear()
+
+    def stats(self) -> dict:
+        """Return per-model load time, memory added and use count."""
+        with self._lock:
+            models = [dict(stats) for stats in self._stats.values()]
+        return {
+            "pid": os.getpid(),
+            "models": models,
+            "total_load_ms": round(sum(m["load_ms"] for m in models), 2),
+            "total_rss_bytes": sum(m["rss_bytes"] for m in models),
+            "process_rss_bytes": _rss_bytes(),
+        }
+
+
+# Process-wide registry shared by every parse in this process
+nlp_models = ModelRegistry()
+
+
+def model_stats() -> dict:
+    """Stats of this process's registry; module-level so worker pools can call it."""
+    return nlp_models.stats()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+OCR for Scanned Resume Pages
+
+Recognises the text of pages that have no text layer. Each page is
+rendered at a resolution chosen from its content (near the native
+resolution of an embedded scan, a fixed one otherwise), the rendered
+image is hashed, and the recognised text is cached under that hash in
+memory and in the artifact store, so a re-uploaded scan is not OCR'd
+again by any worker.
+
+Tesseract runs on a bounded thread pool (each run is a tesseract
+subprocess). OCR happens in every process that extracts pages (the parse
+workers and the page-parallel extraction workers), so the run limit is
+held host-wide: each run takes one of RESUME_OCR_WORKERS slots, which are
+flock()ed files in a shared directory. The kernel releases a slot when its
+holder exits, so a worker killed mid-run cannot leak it. A semaphore caps
+the pages each process has being recognised or waiting for a slot, and
+each run has a timeout; a page that cannot be recognised in time comes
+back empty rather than failing the parse.
+
+Configuration (environment variables):
+    RESUME_OCR_WORKERS        Concurrent tesseract runs across all processes on the host (default: 2)
+    RESUME_OCR_QUEUE          Pages each process allows to wait for a free slot (default: 2 x workers)
+    RESUME_OCR_SLOT_DIR       Directory of the shared slot locks (default: tmp/resume-ocr-slots;
+                              empty, or a platform without flock, limits each process separately)
+    RESUME_OCR_TIMEOUT        Seconds before a tesseract run is abandoned (default: 30)
+    RESUME_OCR_DPI            Resolution for pages without an embedded scan (default: 300)
+    RESUME_OCR_MIN_DPI        Lowest resolution a scanned page is rendered at (default: 150)
+    RESUME_OCR_MAX_DPI        Highest resolution a scanned page is rendered at (default: 400)
+    RESUME_OCR_LANG           Tesseract language(s) (default: eng)
+    RESUME_OCR_CACHE_ENTRIES  Recognised pages kept in memory (default: 256)
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Optional
+
+from backend.artifact_store import artifact_store
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+OCR_DPI = int(os.environ.get("RESUME_OCR_DPI", "300"))
+OCR_MIN_DPI = int(os.environ.get("RESUME_OCR_MIN_DPI", "150"))
+OCR_MAX_DPI = int(os.environ.get("RESUME_OCR_MAX_DPI", "400"))
+OCR_LANG = os.environ.get("RESUME_OCR_LANG", "eng")
+OCR_SLOT_DIR = os.environ.get(
+    "RESUME_OCR_SLOT_DIR",
+    os.path.join(tempfile.gettempdir(), "resume-ocr-slots")
+)
+
+# Latency samples kept for the percentiles in stats()
+_LATENCY_SAMPLES = 256
+# Seconds between attempts to take a host-wide slot
+_SLOT_POLL = 0.05
+
+
+class OCRUnavailable(Exception):
+    """Raised when pytesseract (or the tesseract binary) is not installed."""
+
+
+def choose_resolution(page) -> int:
+    """
+    Pick the render resolution for OCR from what is on ``page``.
+
+    A scanned page is one large embedded image: rendering it above the
+    scan's own resolution adds pixels but no detail, and below it loses
+    strokes, so it is rendered near its native DPI within the configured
+    bounds. Pages without images (text drawn as outlines) use RESUME_OCR_DPI.
+    """
+    best_area, native_dpi = 0.0, None
+    for image in getattr(page, "images", None) or []:
+        width_in = (image["x1"] - image["x0"]) / 72
+        height_in = (image["bottom"] - image["top"]) / 72
+        srcsize = image.get("srcsize")
+        if width_in <= 0 or height_in <= 0 or not srcsize:
+            continue
+        if width_in * height_in > best_area:
+            best_area = width_in * height_in
+            native_dpi = srcsize[0] / width_in
+    if native_dpi is None:
+        return OCR_DPI
+    return int(min(max(native_dpi, OCR_MIN_DPI), OCR_MAX_DPI))
+
+
+def image_digest(image) -> str:
+    """Digest of a rendered page image's pixels."""
+    h = hashlib.sha256()
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 2)
+
+
+class _HostSlots:
+    """
+    ``count`` run slots shared by every process on the host, each an
+    exclusive flock on its own file in ``directory``.
+
+    Without a directory (or without fcntl) every slot is granted at once,
+    leaving the per-process thread pool as the only limit.
+    """
+
+    def __init__(self, count: int, directory: Optional[str]):
+        self.count = count
+        self.directory = (directory or None) if fcntl is not None else None
+
+    def _acquire(self, timeout: float) -> Optional[int]:
+        os.makedirs(self.directory, exist_ok=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            for i in range(self.count):
+                fd = os.open(os.path.join(self.directory, f"slot-{i}.lock"), os.O_RDWR | os.O_CREAT, 0o666)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(_SLOT_POLL)
+
+    @contextmanager
+    def slot(self, timeout: float):
+        """Hold a slot for the block; yields False if none freed up within ``timeout``."""
+        if self.directory is None:
+            yield True
+            return
+        fd = self._acquire(timeout)
+        try:
+            yield fd is not None
+        finally:
+            if fd is not None:
+                # Closing the descriptor drops the lock
+                os.close(fd)
+
+
+class OCREngine:
+    """
+    Bounded tesseract pool with a page-image text cache and latency counters.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache_entries: Optional[int] = None,
+        lang: str = OCR_LANG,
+        slot_dir: Optional[str] = OCR_SLOT_DIR
+    ):
+        self.workers = max(workers if workers is not None else int(
+            os.environ.get("RESUME_OCR_WORKERS", "2")
+        ), 1)
+        self.max_queue = max_queue if max_queue is not None else int(
+            os.environ.get("RESUME_OCR_QUEUE", str(2 * self.workers))
+        )
+        self.timeout = timeout if timeout is not None else float(
+            os.environ.get("RESUME_OCR_TIMEOUT", "30")
+        )
+        self.cache_entries = cache_entries if cache_entries is not None else int(
+            os.environ.get("RESUME_OCR_CACHE_ENTRIES", "256")
+        )
+        self.lang = lang
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._host_slots = _HostSlots(self.workers, slot_dir)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.pages = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failed = 0
+        self.runs = 0
+        self.render_ms = 0.0
+        self.queue_ms = 0.0
+        self.tesseract_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+            return self._executor
+
+    def _cache_key(self, digest: str) -> str:
+        return artifact_store.key("ocr", digest, self.lang)
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return text
+        data = artifact_store.read(key, "txt")
+        if data is None:
+            return None
+        text = data.decode("utf-8")
+        self._remember(key, text)
+        with self._lock:
+            self.disk_hits += 1
+        return text
+
+    def _remember(self, key: str, text: str):
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _tesseract(self, image, queued_at: float) -> Optional[str]:
+        """Run tesseract in a host-wide slot; None if no slot freed up in time."""
+        import pytesseract
+
+        with self._host_slots.slot(self.timeout) as acquired:
+            started = time.perf_counter()
+            with self._lock:
+                self.queue_ms += (started - queued_at) * 1000
+            if not acquired:
+                return None
+            try:
+                return pytesseract.image_to_string(image, lang=self.lang, timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self.runs += 1
+                    self.tesseract_ms += (time.perf_counter() - started) * 1000
+
+    def recognize_image(self, image) -> str:
+        """
+        Return the text in a rendered page ``image``, from the cache when
+        the same pixels were recognised before.
+
+        Returns "" when the queue or the host-wide slots stay full, or
+        tesseract times out.
+
+        Raises:
+            OCRUnavailable: pytesseract or tesseract is not installed
+        """
+        key = self._cache_key(image_digest(image))
+        text = self._cached(key)
+        if text is not None:
+            return text
+
+        try:
+            import pytesseract
+        except ImportError:
+            raise OCRUnavailable("pytesseract not installed")
+
+        with self._lock:
+            self.misses += 1
+        # Wait at most one timeout for a slot; beyond that the caller would
+        # rather have the page empty than hold up the whole parse
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            print(f"OCR queue is full ({self.workers + self.max_queue} pages in flight); skipping page")
+            return ""
+        try:
+            future = self._get_executor().submit(self._tesseract, image, time.perf_counter())
+            try:
+                # One timeout waiting for a host-wide slot, one for the run
+                text = future.result(timeout=2 * self.timeout)
+            except (FutureTimeout, RuntimeError) as e:
+                # pytesseract kills tesseract and raises RuntimeError on its timeout
+                if isinstance(e, RuntimeError) and "timeout" not in str(e).lower():
+                    raise
+                with self._lock:
+                    self.timeouts += 1
+                print(f"OCR exceeded {self.timeout:g}s; skipping page")
+                return ""
+            except pytesseract.TesseractNotFoundError as e:
+                raise OCRUnavailable(str(e))
+        except OCRUnavailable:
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            self._slots.release()
+
+        if text is None:
+            with self._lock:
+                self.rejected += 1
+            print(f"All {self.workers} OCR slots on this host stayed busy; skipping page")
+            return ""
+        artifact_store.put(key, "txt", text.encode("utf-8"))
+        self._remember(key, text)
+        return text
+
+    def recognize_page(self, page) -> str:
+        """Render a pdfplumber ``page`` at a content-dependent resolution and OCR it."""
+        started = time.perf_counter()
+        resolution = choose_resolution(page)
+        image = page.to_image(resolution=resolution).original
+        rendered = time.perf_counter()
+        try:
+            return self.recognize_image(image)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.pages += 1
+                self.render_ms += (rendered - started) * 1000
+                self._latencies.append((finished - started) * 1000)
+
+    def shutdown(self):
+        """Stop the tesseract workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """Return cache counters, admission counters and per-stage latencies."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "pid": os.getpid(),
+                "workers": self.workers,
+                "slot_dir": self._host_slots.directory,
+                "max_queue": self.max_queue,
+                "timeout": self.timeout,
+                "pages": self.pages,
+                "cache_entries": len(self._cache),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "failed": self.failed,
+                "avg_render_ms": round(self.render_ms / self.pages, 2) if self.pages else 0,
+                "tesseract_runs": self.runs,
+                "avg_queue_ms": round(self.queue_ms / self.runs, 2) if self.runs else 0,
+                "avg_tesseract_ms": round(self.tesseract_ms / self.runs, 2) if self.runs else 0,
+                "page_p50_ms": _percentile(self._latencies, 0.5),
+                "page_p95_ms": _percentile(self._latencies, 0.95),
+            }
+
+
+# Process-wide OCR engine shared by every parse in this process
+ocr_engine = OCREngine()
+
+
+def ocr_stats() -> dict:
+    """Stats of this process's OCR engine; module-level so worker pools can call it."""
+    return ocr_engine.stats()
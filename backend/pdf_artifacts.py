@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Cached PDF Rendering
+
+Shared render path for the PDF endpoints: look the PDF up in the artifact
+store, render it on the PDF pool on a miss, and store the result. Optimized
+PDFs (recompressed, downsampled images) are stored next to their source PDF
+under a key derived from the source's key. They are rendered once, without
+the source, so the original size is only reported when the source PDF is
+already stored.
+
+Every PDF is rendered in deterministic mode, so an artifact key identifies
+the exact bytes and doubles as a strong ETag. When WeasyPrint fails, the
+plain-text fallback PDF is served but neither stored nor given the ETag,
+so the next request renders again.
+"""
+
+import asyncio
+import os
+from typing import NamedTuple, Optional
+
+from backend.artifact_store import artifact_store
+from backend.html_to_pdf import PDFFallbackOutput, optimize_options
+from backend.pdf_pool import pdf_pool
+
+
+class PDFArtifact(NamedTuple):
+    """A rendered PDF: its stored path and/or bytes, and its size(s)."""
+    path: Optional[str]
+    data: Optional[bytes]
+    # Unoptimized size; None for an optimized PDF whose source is not stored
+    source_bytes: Optional[int]
+    optimized_bytes: Optional[int] = None
+    # The FPDF fallback rather than WeasyPrint output; never stored
+    fallback: bool = False
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+def optimized_key(key: str) -> str:
+    """Artifact key of the optimized copy of the PDF stored under ``key``."""
+    return artifact_store.key("pdf-optimized", key, repr(sorted(optimize_options().items())))
+
+
+def pdf_etag(key: str, optimize: bool = False) -> str:
+    """Strong ETag of the PDF (or its optimized copy) stored under ``key``."""
+    return f'"{optimized_key(key) if optimize else key}"'
+
+
+def _stored_size(key: str) -> Optional[int]:
+    try:
+        return os.path.getsize(artifact_store.path(key, "pdf"))
+    except OSError:
+        return None
+
+
+async def _render_and_store(key: str, html: str, css_content: Optional[str], **options):
+    try:
+        pdf_bytes = await pdf_pool.render(html, css_content=css_content, deterministic=True, **options)
+    except PDFFallbackOutput as e:
+        print(f"Not caching fallback PDF: {e}")
+        return None, e.pdf_bytes, len(e.pdf_bytes), True
+    # Writing may trigger an eviction scan; keep both off the event loop
+    path = await asyncio.to_thread(artifact_store.put, key, "pdf", pdf_bytes)
+    return path, pdf_bytes, len(pdf_bytes), False
+
+
+def cached_pdf_artifact(key: str, optimize: bool = False) -> Optional[PDFArtifact]:
+    """
+    Return the stored PDF (or its optimized copy) for ``key``, or None.
+
+    The bytes are read up front, so a file evicted by another worker after
+    this returns cannot fail the response; one evicted before is a miss.
+    """
+    if not optimize:
+        data = artifact_store.read(key, "pdf")
+        return PDFArtifact(artifact_store.path(key, "pdf"), data, len(data)) if data is not None else None
+
+    source_size = _stored_size(key)
+    opt_key = optimized_key(key)
+    data = artifact_store.read(opt_key, "pdf")
+    if data is None:
+        return None
+    return PDFArtifact(artifact_store.path(opt_key, "pdf"), data, source_size, len(data))
+
+
+async def render_pdf_artifact(
+    key: str,
+    html: str,
+    css_content: Optional[str] = None,
+    optimize: bool = False
+) -> PDFArtifact:
+    """
+    Render the PDF for ``html`` on the pool and store it under ``key``.
+
+    Call this after cached_pdf_artifact missed. With ``optimize`` only the
+    size-optimized PDF is rendered (one pool slot per request); the saving
+    is reported when the unoptimized source is already stored.
+    """
+    if not optimize:
+        path, data, size, fallback = await _render_and_store(key, html, css_content)
+        return PDFArtifact(path, data, size, fallback=fallback)
+
+    opt_key = optimized_key(key)
+    path, data, optimized_size, fallback = await _render_and_store(opt_key, html, css_content, optimize=True)
+    source_size = await asyncio.to_thread(_stored_size, key)
+    print(f"Optimized PDF: {source_size if source_size is not None else '?'} -> {optimized_size} bytes")
+    return PDFArtifact(path, data, source_size, optimized_size, fallback=fallback)
+
+
+def cache_headers(artifact: PDFArtifact, etag: str) -> dict:
+    """The strong ETag for real output; fallback output must not be cached."""
+    if artifact.fallback:
+        return {"Cache-Control": "no-store"}
+    return {"ETag": etag}
+
+
+def size_headers(artifact: PDFArtifact) -> dict:
+    """Response headers reporting the PDF's size before and after optimization."""
+    if artifact.optimized_bytes is None:
+        return {}
+    headers = {"X-PDF-Optimized-Bytes": str(artifact.optimized_bytes)}
+    if artifact.source_bytes:
+        saved = 1 - artifact.optimized_bytes / artifact.source_bytes
+        headers["X-PDF-Original-Bytes"] = str(artifact.source_bytes)
+        headers["X-PDF-Saved-Percent"] = f"{saved * 100:.1f}"
+    return headers
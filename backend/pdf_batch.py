@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Streaming Batch PDF Output
+
+Renders a batch of HTML documents on the PDF worker pool and returns the
+results either as a zip archive streamed as they finish or as one merged PDF.
+The zip is written to an unseekable sink, so each member goes out as soon
+as its render completes and only the documents still rendering are held in
+memory. The zip ends with a manifest.json listing per-document timings and
+errors.
+
+Merged output needs the optional ``pypdf`` package. A PDF's cross-reference
+table covers every object, so nothing can be sent before the last document
+has been appended: the merged file is built in memory and returned whole,
+along with per-document results so the caller can report failures.
+Documents are appended in request order as soon as they and their
+predecessors are done, so besides the merged file only out-of-order
+results are held.
+"""
+
+import asyncio
+import io
+import json
+import os
+import time
+import zipfile
+from typing import AsyncIterator, List, NamedTuple, Optional
+
+from backend.pdf_artifacts import cached_pdf_artifact, render_pdf_artifact
+from backend.pdf_pool import pdf_pool
+
+MANIFEST_NAME = "manifest.json"
+BATCH_FORMATS = ("zip", "merged")
+
+
+class BatchJob(NamedTuple):
+    """One document of a batch: output name, HTML, CSS and artifact key."""
+    name: str
+    html: str
+    css_content: Optional[str]
+    key: str
+
+
+class MergedBatch(NamedTuple):
+    """A merged PDF (None when no document rendered) and per-document results."""
+    pdf: Optional[bytes]
+    documents: List[dict]
+
+
+def unique_pdf_names(names: List[str]) -> List[str]:
+    """Turn requested names into distinct, path-free ``*.pdf`` member names."""
+    used = set()
+    result = []
+    for index, name in enumerate(names):
+        stem = os.path.basename(name or "").strip()
+        if stem.lower().endswith(".pdf"):
+            stem = stem[:-4]
+        stem = stem or f"resume-{index + 1}"
+        candidate, count = f"{stem}.pdf", 1
+        # Skip suffixed names another input already took (e.g. "a", "a-2", "a")
+        while candidate in used:
+            count += 1
+            candidate = f"{stem}-{count}.pdf"
+        used.add(candidate)
+        result.append(candidate)
+    return result
+
+
+def merge_available() -> bool:
+    """Whether pypdf is installed for merged output."""
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer drained by the response generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _render_one(index: int, job: BatchJob, limit: asyncio.Semaphore, optimize: bool):
+    started = time.perf_counter()
+    entry = {"name": job.name}
+    pdf_bytes = None
+    try:
+        artifact = await asyncio.to_thread(cached_pdf_artifact, job.key, optimize=optimize)
+        if artifact:
+            entry["cached"] = True
+        else:
+            async with limit:
+                artifact = await render_pdf_artifact(job.key, job.html, job.css_content, optimize=optimize)
+        pdf_bytes = artifact.read()
+        entry["bytes"] = len(pdf_bytes)
+        if artifact.optimized_bytes is not None and artifact.source_bytes is not None:
+            entry["original_bytes"] = artifact.source_bytes
+        if artifact.fallback:
+            entry["fallback"] = True
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+        print(f"Batch PDF {job.name} failed: {entry['error']}")
+    entry["ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return index, entry, pdf_bytes
+
+
+def _completions(jobs: List[BatchJob], optimize: bool):
+    # Leave the pool's queue slots to other requests: a batch never has
+    # more renders outstanding than there are workers
+    limit = asyncio.Semaphore(max(pdf_pool.size, 1))
+    return asyncio.as_completed([_render_one(i, job, limit, optimize) for i, job in enumerate(jobs)])
+
+
+async def stream_zip(jobs: List[BatchJob], optimize: bool = False) -> AsyncIterator[bytes]:
+    """Yield a zip archive of the rendered PDFs in completion order."""
+    started = time.perf_counter()
+    sink = _ChunkSink()
+    entries = [None] * len(jobs)
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for completion in _completions(jobs, optimize):
+            index, entry, pdf_bytes = await completion
+            entries[index] = entry
+            if pdf_bytes is not None:
+                archive.writestr(jobs[index].name, pdf_bytes)
+                yield sink.drain()
+        manifest = {
+            "documents": entries,
+            "succeeded": sum(1 for e in entries if "error" not in e),
+            "failed": sum(1 for e in entries if "error" in e),
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+    yield sink.drain()
+
+
+async def render_merged(jobs: List[BatchJob], optimize: bool = False) -> MergedBatch:
+    """Render every document and merge the ones that succeed, in request order."""
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    entries = [None] * len(jobs)
+    done = {}
+    next_index = 0
+    for completion in _completions(jobs, optimize):
+        index, entry, pdf_bytes = await completion
+        entries[index] = entry
+        done[index] = pdf_bytes
+        # Append finished documents as soon as their predecessors are in, so
+        # only out-of-order results wait in memory
+        while next_index in done:
+            pdf_bytes = done.pop(next_index)
+            if pdf_bytes is not None:
+                writer.append(PdfReader(io.BytesIO(pdf_bytes)), outline_item=jobs[next_index].name[:-4])
+            next_index += 1
+
+    if all("error" in entry for entry in entries):
+        return MergedBatch(None, entries)
+    sink = _ChunkSink()
+    writer.write(sink)
+    return MergedBatch(sink.drain(), entries)
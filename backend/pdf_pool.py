@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Warm PDF Rendering Pool
+
+Runs WeasyPrint in a dedicated pool of worker processes so a PDF render
+never blocks the API's event loop. Workers are pre-warmed (WeasyPrint
+imported, fonts loaded, base stylesheet parsed), jobs are admitted through
+a bounded queue, every job has a timeout, and the pool is recycled after a
+number of jobs to cap memory growth in long-lived workers.
+
+Jobs wait for a free worker in the API process, not in the executor's
+queue, so the timeout only counts time spent rendering. A job that times
+out cannot be cancelled, so the pool it runs on is retired and its workers
+are terminated; the same happens when a worker crashes and breaks the
+pool. Other jobs that were running on those workers did nothing wrong:
+they are re-submitted to the replacement pool (a bounded number of times)
+instead of failing.
+
+Configuration (environment variables):
+    RESUME_PDF_WORKERS   Worker processes (default: CPU count; 0 renders in a thread)
+    RESUME_PDF_QUEUE     Jobs allowed to wait for a free worker (default: 2 x workers)
+    RESUME_PDF_TIMEOUT   Seconds before a job is abandoned (default: 60)
+    RESUME_PDF_MAX_JOBS  Jobs per worker before the pool is recycled (default: 200)
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+# Attempts per job when its workers die underneath it
+MAX_ATTEMPTS = 3
+
+
+class PDFPoolBusy(Exception):
+    """Raised when the render queue is full."""
+
+
+class PDFRenderTimeout(Exception):
+    """Raised when a render job exceeds its timeout."""
+
+
+def _warm_worker():
+    # Pay WeasyPrint's import, font discovery and base CSS parse once per worker
+    try:
+        from weasyprint import HTML
+        from backend.html_to_pdf import get_base_stylesheet, get_font_config
+
+        HTML(string="<p>warm-up</p>").render(
+            stylesheets=[get_base_stylesheet()],
+            font_config=get_font_config()
+        )
+    except Exception as e:
+        print(f"PDF worker warm-up failed: {e}")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render_job(html: str, css_content: Optional[str], options: dict) -> Tuple[bytes, int, dict]:
+    from backend.html_to_pdf import html_to_pdf, render_cache_stats
+
+    pdf_bytes = html_to_pdf(html, css_content=css_content, **options)
+    # Workers' cache counters are invisible to the API process otherwise
+    return pdf_bytes, os.getpid(), render_cache_stats()
+
+
+def _sum_counters(snapshots: List[dict]) -> dict:
+    """Add up numeric counters across per-worker stats dicts."""
+    total = {}
+    for snapshot in snapshots:
+        for key, value in snapshot.items():
+            if isinstance(value, dict):
+                total[key] = _sum_counters([total.get(key, {}), value])
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+class PDFRenderPool:
+    """
+    Pool of warm WeasyPrint worker processes with admission control.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_jobs_per_worker: Optional[int] = None
+    ):
+        self.size = size if size is not None else int(
+            os.environ.get("RESUME_PDF_WORKERS", str(os.cpu_count() or 1))
+        )
+        self.max_queue = max_queue if max_queue is not None else int(
+            os.environ.get("RESUME_PDF_QUEUE", str(2 * max(self.size, 1)))
+        )
+        self.timeout = timeout if timeout is not None else float(
+            os.environ.get("RESUME_PDF_TIMEOUT", "60")
+        )
+        self.max_jobs_per_worker = max_jobs_per_worker if max_jobs_per_worker is not None else int(
+            os.environ.get("RESUME_PDF_MAX_JOBS", "200")
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._generation_jobs = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.recycles = 0
+        self.resubmitted = 0
+        self.total_render_ms = 0.0
+        self._worker_stats: Dict[int, dict] = {}
+        # Executors already retired and terminated by _kill
+        self._killed = weakref.WeakSet()
+        # One slot per worker, bound to the event loop that created it
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+
+    @property
+    def capacity(self) -> int:
+        """Jobs that may be running or queued at once."""
+        return max(self.size, 1) + self.max_queue
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.size, initializer=_warm_worker)
+
+    def start(self):
+        """Spawn and warm all workers now instead of on the first request."""
+        if self.size <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            executor = self._executor
+        for future in [executor.submit(_ping) for _ in range(self.size)]:
+            future.result()
+
+    def _executor_for_job(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            elif self._generation_jobs >= self.size * self.max_jobs_per_worker:
+                # Replace the pool; running jobs finish on the old workers
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                self._generation_jobs = 0
+                self._worker_stats.clear()
+                self.recycles += 1
+            self._generation_jobs += 1
+            return self._executor
+
+    def _kill(self, executor: ProcessPoolExecutor):
+        # A timed-out job cannot be cancelled once running, and a pool whose
+        # worker crashed is unusable; retire it so new jobs go to fresh
+        # workers, then terminate the generation. Its other jobs fail with
+        # BrokenProcessPool and _run_job re-submits them.
+        with self._lock:
+            if executor in self._killed:
+                return
+            self._killed.add(executor)
+            if self._executor is executor:
+                self._executor = None
+                self._generation_jobs = 0
+                self._worker_stats.clear()
+                self.recycles += 1
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+    def _worker_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(max(self.size, 1))
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run_job(self, html: str, css_content: Optional[str], options: dict):
+        if self.size <= 0:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(_render_job, html, css_content, options), timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise PDFRenderTimeout(f"PDF render exceeded {self.timeout:g}s")
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            executor = self._executor_for_job()
+            try:
+                future = executor.submit(_render_job, html, css_content, options)
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self._kill(executor)
+                raise PDFRenderTimeout(f"PDF render exceeded {self.timeout:g}s")
+            except BrokenProcessPool:
+                # A worker crashed or was terminated after another job's
+                # timeout; replace the generation and retry on fresh workers
+                self._kill(executor)
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                self.resubmitted += 1
+
+    async def render(self, html: str, css_content: Optional[str] = None, **options) -> bytes:
+        """
+        Render ``html`` to PDF bytes on a pool worker.
+
+        Extra keyword arguments are passed through to html_to_pdf.
+
+        Raises:
+            PDFPoolBusy: the queue is full
+            PDFRenderTimeout: the job rendered longer than the configured timeout
+        """
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise PDFPoolBusy(f"PDF render queue is full ({self.in_flight} jobs in flight)")
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            # Wait for a worker here rather than in the executor's queue, so
+            # the timeout starts when the job can actually run
+            async with self._worker_slots():
+                pdf_bytes, pid, worker_stats = await self._run_job(html, css_content, options)
+            self.completed += 1
+            self._worker_stats[pid] = worker_stats
+            self.total_render_ms += (time.perf_counter() - started) * 1000
+            return pdf_bytes
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        """Stop all workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def worker_cache_stats(self) -> dict:
+        """
+        Return the render cache counters summed over the pool's workers.
+
+        Workers report their counters with every finished job; recycling the
+        pool starts them over.
+        """
+        snapshots = list(self._worker_stats.values())
+        totals = _sum_counters(snapshots)
+        for name in ("stylesheets", "resources"):
+            counters = totals.get(name)
+            if counters:
+                lookups = counters.get("hits", 0) + counters.get("disk_hits", 0) + counters.get("misses", 0)
+                hits = counters.get("hits", 0) + counters.get("disk_hits", 0)
+                counters["hit_rate"] = round(hits / lookups, 4) if lookups else 0
+        totals["workers_reporting"] = len(snapshots)
+        return totals
+
+    def stats(self) -> dict:
+        """Return pool configuration, queue depth and job counters."""
+        return {
+            "workers": self.size,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "max_jobs_per_worker": self.max_jobs_per_worker,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - max(self.size, 1), 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "recycles": self.recycles,
+            "resubmitted": self.resubmitted,
+            "avg_render_ms": round(self.total_render_ms / self.completed, 2) if self.completed else 0,
+        }
+
+
+# Process-wide pool used by the API endpoints
+pdf_pool = PDFRenderPool()
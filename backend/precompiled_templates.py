@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-Time Template Compilation
+
+Precompiles the bundled ``templates/`` directory into importable Python
+modules (Jinja2's module format) together with a manifest of source
+digests. At runtime ``PrecompiledLoader`` imports a template's module
+instead of parsing it, and falls back to compiling the source when the
+file has changed since the build, or when the modules were built by a
+different Jinja2 or Python version.
+
+Build step:
+    python -m backend.precompiled_templates
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import threading
+from pathlib import Path
+from typing import Optional
+
+import jinja2
+
+from backend.template_cache import template_cache, template_digest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES_DIR = str(REPO_ROOT / "templates")
+COMPILED_DIR = os.environ.get(
+    "RESUME_COMPILED_TEMPLATES",
+    str(REPO_ROOT / "build" / "compiled_templates")
+)
+MANIFEST_NAME = "manifest.json"
+TEMPLATE_SUFFIX = ".j2"
+
+
+def _environment_options() -> dict:
+    # Must match the runtime environment or compiled code would differ
+    return {"autoescape": True}
+
+
+def _build_info() -> dict:
+    # Compiled modules are Jinja2- and Python-version specific: a module built
+    # by another version is stale whatever its sources say
+    return {"jinja2": jinja2.__version__, "python": platform.python_version()}
+
+
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compile_templates(src_dir: str = TEMPLATES_DIR, out_dir: str = COMPILED_DIR) -> dict:
+    """
+    Compile every ``*.j2`` template under ``src_dir`` into ``out_dir``.
+
+    Returns the manifest written next to the modules: the Jinja2 and Python
+    versions that built them, and for each template name the size, mtime
+    and SHA-256 of the source it was built from.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(src_dir), **_environment_options())
+    names = env.list_templates(filter_func=lambda name: name.endswith(TEMPLATE_SUFFIX))
+
+    templates = {}
+    for name in names:
+        path = os.path.join(src_dir, name)
+        st = os.stat(path)
+        templates[name] = {
+            "module": jinja2.ModuleLoader.get_module_filename(name),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": _file_digest(path),
+        }
+
+    env.compile_templates(out_dir, filter_func=lambda name: name in templates, zip=None, ignore_errors=False)
+    manifest = {"build": _build_info(), "templates": templates}
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class PrecompiledLoader(jinja2.BaseLoader):
+    """
+    Loads templates from precompiled modules when they match the source on
+    disk, and from the source itself otherwise.
+
+    Freshness is checked by size and mtime first and by content digest only
+    when those differ, so an unchanged checkout costs two ``stat`` calls.
+    """
+
+    def __init__(self, src_dir: str = TEMPLATES_DIR, compiled_dir: str = COMPILED_DIR):
+        self.src_dir = src_dir
+        self.compiled_dir = compiled_dir
+        self.source_loader = jinja2.FileSystemLoader(src_dir)
+        self.module_loader = None
+        self.manifest = {}
+        manifest_path = os.path.join(compiled_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("build") == _build_info():
+                self.manifest = manifest["templates"]
+                self.module_loader = jinja2.ModuleLoader(compiled_dir)
+            else:
+                print(f"Ignoring precompiled templates in {compiled_dir}: built by a different Jinja2/Python version")
+        self.compiled_loads = 0
+        self.source_loads = 0
+
+    def is_fresh(self, name: str) -> bool:
+        """Whether the precompiled module for ``name`` matches its source."""
+        entry = self.manifest.get(name)
+        if entry is None:
+            return False
+        path = os.path.join(self.src_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        return st.st_size == entry["size"] and _file_digest(path) == entry["sha256"]
+
+    def get_source(self, environment, template):
+        return self.source_loader.get_source(environment, template)
+
+    def list_templates(self):
+        return self.source_loader.list_templates()
+
+    def load(self, environment, name, globals=None):
+        if self.module_loader is not None and self.is_fresh(name):
+            try:
+                template = self.module_loader.load(environment, name, globals)
+            except jinja2.TemplateNotFound:
+                pass
+            else:
+                # Module templates report themselves as always up to date;
+                # tie that to the source so auto_reload picks up edits
+                template._uptodate = lambda: self.is_fresh(name)
+                self.compiled_loads += 1
+                return template
+        self.source_loads += 1
+        return super().load(environment, name, globals)
+
+
+_bundled_environment: Optional[jinja2.Environment] = None
+_bundled_lock = threading.Lock()
+
+
+def bundled_environment() -> jinja2.Environment:
+    """Process-wide environment for the bundled templates directory."""
+    global _bundled_environment
+    with _bundled_lock:
+        if _bundled_environment is None:
+            _bundled_environment = jinja2.Environment(
+                loader=PrecompiledLoader(),
+                auto_reload=True,
+                **_environment_options()
+            )
+        return _bundled_environment
+
+
+def is_bundled_template(template_file: str) -> bool:
+    """Whether ``template_file`` lives in the bundled templates directory."""
+    return os.path.dirname(os.path.abspath(template_file)) == TEMPLATES_DIR
+
+
+def warm_template_cache() -> int:
+    """
+    Seed the compiled-template cache with the precompiled bundled templates.
+
+    Uploads whose bytes match a bundled template (the frontend sends
+    ``resume.html.j2`` verbatim) then hit the cache on their first request.
+    Only templates with a fresh precompiled module are loaded, so this never
+    parses anything. Returns the number of templates added.
+    """
+    env = bundled_environment()
+    loader = env.loader
+    warmed = 0
+    for name in loader.manifest:
+        if not loader.is_fresh(name):
+            continue
+        with open(os.path.join(loader.src_dir, name), 'rb') as f:
+            source = f.read()
+        template_cache.put(template_digest(source), env.get_template(name))
+        warmed += 1
+    return warmed
+
+
+def main():
+    p = argparse.ArgumentParser(
+        description="Precompile the bundled Jinja2 templates into Python modules."
+    )
+    p.add_argument("--src", default=TEMPLATES_DIR, help="Template source directory")
+    p.add_argument("--out", default=COMPILED_DIR, help="Output directory for compiled modules")
+    args = p.parse_args()
+
+    templates = compile_templates(args.src, args.out)["templates"]
+    for name, entry in templates.items():
+        print(f"Compiled {name} -> {entry['module']}")
+    print(f"Wrote {len(templates)} template(s) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,22 @@ import jinja2
 import sys
 import os
 import re
+from typing import Iterator
+
+# Add the parent directory to the path so `python backend/render_resume.py` can import the backend module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.data_cache import data_cache
+from backend.merge_plan import compile_merge_plan, get_merge_plan
+from backend.precompiled_templates import bundled_environment, is_bundled_template, warm_template_cache
+from backend.template_cache import get_template
+
+# Rendered output is flushed to the client in chunks of about this many characters
+STREAM_CHUNK_SIZE = 16 * 1024
+HEAD_CLOSE_RE = re.compile(r'</head>', re.IGNORECASE)
 
 def merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
-    """Simple recursive merge with Helm-like append control.
+    """Recursive, non-mutating merge with Helm-like append control.
     
     Special keys in the overlay dict:
     - '_append': Controls which fields should append instead of replace
@@ -27,90 +40,44 @@ def merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
     _append: [highlights, skill]
     _merge: [metadata]
     ```
+
+    Neither ``a`` nor ``b`` is modified. A new tree is returned in which every
+    subtree the overlay does not touch is shared with ``a``, so one parsed
+    base can be reused for any number of overlays without copying it.
+
+    The overlay is compiled into a MergePlan first (see backend/merge_plan.py);
+    use get_merge_plan() directly to reuse a compiled overlay across calls.
     """
-    # Extract control flags - use parent flags if none defined at this level
-    append_mode = b.get('_append', parent_append_mode if parent_append_mode is not None else False)
-    merge_mode = b.get('_merge', parent_merge_mode if parent_merge_mode is not None else True)
-    
-    for k, v in b.items():
-        # Skip special control keys
-        if k.startswith('_'):
-            continue
-            
-        if k in a:
-            # Handle nested dictionaries
-            if isinstance(a[k], dict) and isinstance(v, dict):
-                # Check if we should merge this dict
-                should_merge = (
-                    merge_mode is True or
-                    (isinstance(merge_mode, list) and k in merge_mode) or
-                    (isinstance(merge_mode, dict) and k in merge_mode)
-                )
-                
-                if should_merge:
-                    # Recursive merge with the same control flags
-                    merge_dict(a[k], v, append_mode, merge_mode)
-                else:
-                    # Replace the dict entirely
-                    a[k] = v
-            
-            # Handle lists - append or replace
-            elif isinstance(a[k], list) and isinstance(v, list):
-                # Check if we should append this list
-                should_append = (
-                    append_mode is True or
-                    (isinstance(append_mode, list) and k in append_mode) or
-                    (isinstance(append_mode, dict) and k in append_mode)
-                )
-                
-                if should_append:
-                    # Append items to the existing list
-                    a[k].extend(v)
-                else:
-                    # Replace the list entirely
-                    a[k] = v
-                    
-            else:
-                # For non-dict, non-list values, just replace
-                a[k] = v
-        else:
-            # Key doesn't exist in a, just add it
-            a[k] = v
-    
-    return a
+    return compile_merge_plan(b, parent_append_mode, parent_merge_mode).apply(a)
 
-def render_html(
-    base_yaml_bytes: bytes,
-    overlay_yaml_bytes: bytes = None,
-    template_bytes: bytes = None,
-    template_file: str = None,
-    css_bytes: bytes = None
-) -> str:
+def load_resume_data(base_yaml_bytes: bytes, overlay_yaml_bytes: bytes = None):
     """
-    Render resume data to HTML, merging base and overlay YAML into a Jinja2 template.
+    Parse base YAML and merge the optional overlay on top of it.
     """
-    import yaml, jinja2, os
-
-    # Load base YAML
-    data = yaml.safe_load(base_yaml_bytes)
+    if not overlay_yaml_bytes:
+        # Load base YAML
+        return yaml.safe_load(base_yaml_bytes)
 
-    # Merge overlay if provided
-    if overlay_yaml_bytes:
-        overlay = yaml.safe_load(overlay_yaml_bytes)
-        merge_dict(data, overlay)
+    # Reuse the cached, frozen base and the overlay's compiled merge plan;
+    # applying the plan shares every subtree the overlay leaves untouched
+    data = data_cache.get(base_yaml_bytes, None, load_resume_data)
+    return get_merge_plan(overlay_yaml_bytes).apply(data)
 
+def resolve_template(template_bytes: bytes = None, template_file: str = None) -> jinja2.Template:
+    """
+    Return the compiled Jinja2 template from raw bytes or a template file path.
+    """
     # Prepare Jinja2 template
     if template_bytes:
-        # Render directly from provided template string
-        tpl = template_bytes.decode('utf-8')
-        template = jinja2.Environment(
-            loader=jinja2.BaseLoader(),
-            autoescape=True
-        ).from_string(tpl)
+        # Reuse the compiled template when the same source was seen before
+        template = get_template(template_bytes)
     else:
         # Fallback to loading from a file path
         if not template_file:
             raise ValueError("No template_bytes or template_file provided")
+        if is_bundled_template(template_file):
+            # Bundled templates load from their precompiled modules when fresh
+            return bundled_environment().get_template(os.path.basename(template_file))
         tpl_path = os.path.abspath(template_file)
         tpl_dir = os.path.dirname(tpl_path)
         tpl_name = os.path.basename(tpl_path)
@@ -119,32 +86,106 @@ def render_html(
             autoescape=True
         )
         template = env.get_template(tpl_name)
+    return template
+
+def inject_css(rendered_html: str, css_bytes: bytes) -> str:
+    """
+    Inline CSS into rendered HTML inside a <style> tag in the document head.
+    """
+    css = css_bytes.decode('utf-8')
+    # Attempt to inject before </head> (case-insensitive)
+    if re.search(r'</head>', rendered_html, flags=re.IGNORECASE):
+        rendered_html = re.sub(
+            r'(?i)</head>',
+            f"<style>\n{css}\n</style></head>",
+            rendered_html,
+            count=1
+        )
+    # Fallback to injecting after opening <head ...> tag
+    elif re.search(r'<head[^>]*>', rendered_html, flags=re.IGNORECASE):
+        rendered_html = re.sub(
+            r'(?i)(<head[^>]*>)',
+            lambda m: f"{m.group(1)}\n<style>\n{css}\n</style>",
+            rendered_html,
+            count=1
+        )
+    else:
+        # No head tag found; prepend style at top
+        rendered_html = f"<style>\n{css}\n</style>\n" + rendered_html
+    return rendered_html
+
+def render_html(
+    base_yaml_bytes: bytes,
+    overlay_yaml_bytes: bytes = None,
+    template_bytes: bytes = None,
+    template_file: str = None,
+    css_bytes: bytes = None
+) -> str:
+    """
+    Render resume data to HTML, merging base and overlay YAML into a Jinja2 template.
+    """
+    # Load base YAML and merge the overlay, reusing the cached tree if this
+    # exact base/overlay pair was rendered before
+    data = data_cache.get(base_yaml_bytes, overlay_yaml_bytes, load_resume_data)
+    template = resolve_template(template_bytes, template_file)
 
     rendered_html = template.render(resume=data)
     # Inline CSS if provided
     if css_bytes:
-        css = css_bytes.decode('utf-8')
-        # Attempt to inject before </head> (case-insensitive)
-        if re.search(r'</head>', rendered_html, flags=re.IGNORECASE):
-            rendered_html = re.sub(
-                r'(?i)</head>',
-                f"<style>\n{css}\n</style></head>",
-                rendered_html,
-                count=1
-            )
-        # Fallback to injecting after opening <head ...> tag
-        elif re.search(r'<head[^>]*>', rendered_html, flags=re.IGNORECASE):
-            rendered_html = re.sub(
-                r'(?i)(<head[^>]*>)',
-                lambda m: f"{m.group(1)}\n<style>\n{css}\n</style>",
-                rendered_html,
-                count=1
-            )
-        else:
-            # No head tag found; prepend style at top
-            rendered_html = f"<style>\n{css}\n</style>\n" + rendered_html
+        rendered_html = inject_css(rendered_html, css_bytes)
     return rendered_html
 
+def render_html_stream(
+    base_yaml_bytes: bytes,
+    overlay_yaml_bytes: bytes = None,
+    template_bytes: bytes = None,
+    template_file: str = None,
+    css_bytes: bytes = None,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Render resume HTML incrementally with Template.generate().
+
+    Produces the same document as render_html, but yields it in chunks of
+    roughly ``chunk_size`` characters as the template renders. The CSS is
+    emitted as its own chunk right before </head> instead of being spliced
+    into the finished string; output is only held back until </head> has
+    been seen (or, for documents without one, until the end).
+    """
+    data = data_cache.get(base_yaml_bytes, overlay_yaml_bytes, load_resume_data)
+    template = resolve_template(template_bytes, template_file)
+    parts = template.generate(resume=data)
+
+    # Parts may be Markup; joining with str.join keeps "+" from escaping them
+    if css_bytes:
+        style = f"<style>\n{css_bytes.decode('utf-8')}\n</style>"
+        head = ""
+        for part in parts:
+            head = "".join((head, part))
+            match = HEAD_CLOSE_RE.search(head)
+            if match:
+                yield head[:match.start()]
+                yield style
+                pending = ["</head>", head[match.end():]]
+                break
+        else:
+            # No </head> anywhere; fall back to the same placement as inject_css
+            yield inject_css(head, css_bytes)
+            return
+    else:
+        pending = []
+
+    size = sum(len(p) for p in pending)
+    for part in parts:
+        pending.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield "".join(pending)
+
 def main():
     p = argparse.ArgumentParser(
         description="Render a resume YAML through a Jinja2 template."
@@ -163,8 +204,32 @@ def main():
         "--css-file", "-c",
         help="Optional CSS file to embed in the rendered HTML"
     )
+    p.add_argument(
+        "--pdf-output", "-p",
+        help="Optional PDF file to render alongside the HTML (used with --watch)"
+    )
+    p.add_argument(
+        "--watch", "-w", action="store_true",
+        help="Keep running and rebuild when the base, overlay, template (or its includes) or CSS change"
+    )
     args = p.parse_args()
 
+    if args.watch:
+        from backend.watch import BuildTarget, watch
+
+        watch([BuildTarget(
+            base=args.base,
+            template=args.template_file,
+            html_output=args.output,
+            overlay=args.overlay,
+            css=args.css_file,
+            pdf_output=args.pdf_output
+        )])
+        return
+
+    # Load precompiled bundled templates so a matching template skips parsing
+    warm_template_cache()
+
     # Read input files as bytes
     with open(args.base, 'rb') as f:
         base_bytes = f.read()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Caching URL Fetcher for WeasyPrint
+
+A drop-in ``url_fetcher`` that keeps the fonts, images and linked
+stylesheets a template references, so repeat renders do no resource I/O.
+Entries are keyed by URL and checked against a validator before reuse:
+``file://`` resources by their size and mtime, remote resources by age.
+Remote resources are also persisted to a size-capped artifact store so a
+restarted worker starts warm. Once a remote resource is older than the
+TTL it is revalidated with its ETag / Last-Modified when the server sent
+one (a 304 keeps the cached body), and refetched otherwise; stale copies
+that cannot be revalidated are deleted from disk.
+``data:`` URLs are decoded inline by WeasyPrint's fetcher and never cached.
+
+Configuration (environment variables):
+    RESUME_FETCH_CACHE_BYTES  In-memory budget for fetched resources (default: 32MB)
+    RESUME_FETCH_CACHE_DIR    On-disk cache for remote resources (default: tmp/resume-fetch-cache; empty disables)
+    RESUME_FETCH_DISK_BYTES   Size cap of the on-disk cache, evicted least-recently-used (default: 128MB)
+    RESUME_FETCH_TTL          Seconds a remote resource is reused without revalidating (default: 3600)
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import Request, url2pathname, urlopen
+
+from backend.artifact_store import ArtifactStore
+
+DEFAULT_MAX_BYTES = int(os.environ.get("RESUME_FETCH_CACHE_BYTES", str(32 * 1024 * 1024)))
+DEFAULT_CACHE_DIR = os.environ.get(
+    "RESUME_FETCH_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "resume-fetch-cache")
+)
+DEFAULT_DISK_BYTES = int(os.environ.get("RESUME_FETCH_DISK_BYTES", str(128 * 1024 * 1024)))
+DEFAULT_TTL = float(os.environ.get("RESUME_FETCH_TTL", "3600"))
+# Seconds to wait for a remote server, as WeasyPrint's own fetcher does
+FETCH_TIMEOUT = 10
+
+# Result keys worth keeping besides the body itself
+_META_KEYS = ("mime_type", "encoding", "redirected_url", "filename", "path")
+
+
+def _local_path(url: str) -> Optional[str]:
+    parts = urlsplit(url)
+    if parts.scheme != "file":
+        return None
+    return url2pathname(parts.path)
+
+
+def _http_fetch(url: str, revalidate: Optional[dict] = None):
+    """
+    GET a remote ``url``, conditionally when ``revalidate`` holds its ETag /
+    Last-Modified.
+
+    Returns ``(result, validators)`` in the fetcher result format, or
+    ``(None, None)`` when the server answers 304 Not Modified.
+    """
+    headers = {"User-Agent": "resume-as-code"}
+    if revalidate:
+        if revalidate.get("etag"):
+            headers["If-None-Match"] = revalidate["etag"]
+        if revalidate.get("last_modified"):
+            headers["If-Modified-Since"] = revalidate["last_modified"]
+    try:
+        response = urlopen(Request(url, headers=headers), timeout=FETCH_TIMEOUT)
+    except HTTPError as e:
+        if e.code == 304:
+            return None, None
+        raise
+    with response:
+        info = response.info()
+        result = {
+            "string": response.read(),
+            "mime_type": info.get_content_type(),
+            "redirected_url": response.geturl(),
+        }
+        if info.get_content_charset():
+            result["encoding"] = info.get_content_charset()
+        validators = {
+            "etag": info.get("ETag"),
+            "last_modified": info.get("Last-Modified"),
+        }
+    return result, {k: v for k, v in validators.items() if v}
+
+
+def _read_result(result: dict) -> dict:
+    """Copy a fetcher result with any ``file_obj`` read into ``string``."""
+    cached = {k: result[k] for k in _META_KEYS if result.get(k) is not None}
+    if "string" in result:
+        body = result["string"]
+        cached["string"] = body.encode("utf-8") if isinstance(body, str) else body
+    else:
+        file_obj = result["file_obj"]
+        try:
+            cached["string"] = file_obj.read()
+        finally:
+            file_obj.close()
+    return cached
+
+
+class CachingURLFetcher:
+    """
+    Callable with ``default_url_fetcher``'s signature that serves repeat
+    fetches from memory (and remote resources from disk).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        fetcher=None,
+        disk_max_bytes: int = DEFAULT_DISK_BYTES
+    ):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir or None
+        self._disk = ArtifactStore(self.cache_dir, disk_max_bytes) if self.cache_dir else None
+        self.ttl = ttl
+        self._fetcher = fetcher
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.bypassed = 0
+
+    def _fetch(self, url: str, *args, **kwargs) -> dict:
+        fetcher = self._fetcher
+        if fetcher is None:
+            from weasyprint import default_url_fetcher
+            fetcher = default_url_fetcher
+        return fetcher(url, *args, **kwargs)
+
+    def _fetch_remote(self, url: str, revalidate: Optional[dict], *args, **kwargs):
+        """Fetch a remote resource; see _http_fetch for the return value."""
+        if self._fetcher is None and urlsplit(url).scheme in ("http", "https"):
+            return _http_fetch(url, revalidate)
+        # Other schemes, or an injected fetcher: no validators to revalidate with
+        return _read_result(self._fetch(url, *args, **kwargs)), {}
+
+    def _validator(self, url: str):
+        """Cheap fingerprint of a local resource, or None for remote URLs."""
+        path = _local_path(url)
+        if path is None:
+            return None
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+
+    def _is_fresh(self, entry: tuple, validator) -> bool:
+        entry_validator, fetched_at, _, _ = entry
+        if validator is not None:
+            return entry_validator == validator
+        return time.time() - fetched_at < self.ttl
+
+    def _load_disk(self, url: str) -> Optional[tuple]:
+        """Return the persisted entry for ``url`` (possibly stale), or None."""
+        key = self._disk.key("fetch", url)
+        try:
+            meta = json.loads(self._disk.read(key, "json") or b"null")
+            if not meta or meta.pop("url", None) != url:
+                return None
+            fetched_at = meta.pop("fetched_at")
+            revalidate = meta.pop("revalidate", {})
+            body = self._disk.read(key, "bin")
+        except (ValueError, KeyError):
+            return None
+        if body is None:
+            # The body was evicted separately
+            return None
+        meta["string"] = body
+        return (None, fetched_at, meta, revalidate)
+
+    def _delete_disk(self, url: str):
+        key = self._disk.key("fetch", url)
+        self._disk.delete(key, "json")
+        self._disk.delete(key, "bin")
+
+    def _store_disk(self, url: str, entry: tuple, body: bool = True):
+        _, fetched_at, result, revalidate = entry
+        key = self._disk.key("fetch", url)
+        meta = {k: v for k, v in result.items() if k != "string"}
+        meta.update(url=url, fetched_at=fetched_at, revalidate=revalidate)
+        try:
+            # Body first so a reader never sees metadata without its body
+            if body:
+                self._disk.put(key, "bin", result["string"])
+            self._disk.put(key, "json", json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            print(f"Could not persist fetched resource {url}: {e}")
+
+    def _remember(self, url: str, entry: tuple):
+        size = len(entry[2]["string"])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._bytes -= len(old[2]["string"])
+            self._entries[url] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted[2]["string"])
+                self.evictions += 1
+
+    def __call__(self, url: str, *args, **kwargs) -> dict:
+        if url.startswith("data:"):
+            with self._lock:
+                self.bypassed += 1
+            return self._fetch(url, *args, **kwargs)
+
+        validator = self._validator(url)
+        stale = None
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                if self._is_fresh(entry, validator):
+                    self._entries.move_to_end(url)
+                    self.hits += 1
+                    return dict(entry[2])
+                self.stale += 1
+                stale = entry
+
+        if validator is not None:
+            with self._lock:
+                self.misses += 1
+            result = _read_result(self._fetch(url, *args, **kwargs))
+            self._remember(url, (validator, time.time(), result, {}))
+            return dict(result)
+
+        if self._disk is not None:
+            entry = self._load_disk(url)
+            if entry is not None:
+                if self._is_fresh(entry, None):
+                    self._remember(url, entry)
+                    with self._lock:
+                        self.disk_hits += 1
+                    return dict(entry[2])
+                stale = stale or entry
+
+        revalidate = stale[3] if stale is not None else None
+        if not revalidate and stale is not None and self._disk is not None:
+            # Nothing to revalidate with; the stale copy is only garbage now
+            self._delete_disk(url)
+        fetched_at = time.time()
+        try:
+            result, validators = self._fetch_remote(url, revalidate, *args, **kwargs)
+        except Exception:
+            if revalidate and self._disk is not None:
+                self._delete_disk(url)
+            raise
+        if result is None:
+            # 304 Not Modified: keep the body, restart its TTL
+            with self._lock:
+                self.revalidated += 1
+            entry = (None, fetched_at, stale[2], revalidate)
+        else:
+            with self._lock:
+                self.misses += 1
+            entry = (None, fetched_at, result, validators)
+        self._remember(url, entry)
+        if self._disk is not None:
+            # After a 304 the stored body is still current; only its age changes
+            self._store_disk(url, entry, body=result is not None)
+        return dict(entry[2])
+
+    def clear(self):
+        """Drop every in-memory entry (the disk cache is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, hit rate and memory usage."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+                "bypassed": self.bypassed,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0,
+            }
+
+
+# Process-wide fetcher shared by every render in this process
+url_fetcher = CachingURLFetcher()
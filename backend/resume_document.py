@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Extracted Resume Document
+
+The result of decoding an uploaded PDF once: per-page text, words with
+their positions, and page geometry. ResumeParser builds one per upload
+and every later stage (cleaning, PyResParser field extraction, scoring,
+error reporting) reads from it instead of opening the file again.
+Scanned pages without a text layer go through Tesseract OCR
+(backend.ocr) when it is installed.
+
+Long documents (academic CVs, scans) can be extracted in parallel: the
+pages are split into contiguous ranges, each range is extracted by a
+worker process that opens the PDF itself, and the pages are put back in
+order. A page budget stops extraction after the first N pages. Every
+page records how long it took. Each range also brings back its worker's
+OCR stats, so extraction_ocr_stats() can report OCR done on that pool.
+
+Configuration (environment variables):
+    RESUME_EXTRACT_WORKERS    Processes for parallel page extraction (default: 0, extract in-process)
+    RESUME_EXTRACT_MIN_PAGES  Shorter documents are always extracted in-process (default: 4)
+    RESUME_EXTRACT_MAX_PAGES  Page budget; later pages are skipped (default: 0, no limit)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+from backend.ocr import OCRUnavailable, ocr_engine, ocr_stats
+
+EXTRACT_WORKERS = int(os.environ.get("RESUME_EXTRACT_WORKERS", "0"))
+EXTRACT_MIN_PAGES = int(os.environ.get("RESUME_EXTRACT_MIN_PAGES", "4"))
+EXTRACT_MAX_PAGES = int(os.environ.get("RESUME_EXTRACT_MAX_PAGES", "0"))
+
+
+class ExtractedPage(NamedTuple):
+    """One page's text, words and size (in PDF points), and its extraction time."""
+    number: int
+    text: str
+    words: List[dict]
+    width: float
+    height: float
+    ocr: bool = False
+    ms: float = 0.0
+
+
+class ExtractedDocument(NamedTuple):
+    """The pages of a PDF, extracted in a single pass."""
+    path: str
+    pages: List[ExtractedPage]
+    # Pages in the file, including any skipped by the page budget
+    total_pages: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        return "\n".join(page.text for page in self.pages)
+
+    @property
+    def page_count(self) -> int:
+        return self.total_pages if self.total_pages is not None else len(self.pages)
+
+    @property
+    def truncated(self) -> bool:
+        return self.page_count > len(self.pages)
+
+    @property
+    def words(self) -> List[dict]:
+        """Every word, tagged with the number of the page it is on."""
+        return [dict(word, page=page.number) for page in self.pages for word in page.words]
+
+    def timings(self) -> dict:
+        """Per-page extraction times and totals."""
+        return {
+            "pages": len(self.pages),
+            "total_pages": self.page_count,
+            "truncated": self.truncated,
+            "ocr_pages": [page.number for page in self.pages if page.ocr],
+            "page_ms": [page.ms for page in self.pages],
+            "total_ms": round(sum(page.ms for page in self.pages), 2),
+        }
+
+
+# Word attributes kept from pdfplumber; enough to rebuild reading order and columns
+_WORD_KEYS = ("text", "x0", "x1", "top", "bottom")
+
+
+def _ocr_page(page) -> str:
+    try:
+        return ocr_engine.recognize_page(page)
+    except OCRUnavailable as e:
+        print(f"OCR not available ({e})")
+        return ""
+
+
+def extract_page(page, number: int) -> ExtractedPage:
+    """Extract one pdfplumber page."""
+    started = time.perf_counter()
+    text = page.extract_text() or ""
+    ocr = not text.strip() and hasattr(page, 'to_image')
+    if ocr:
+        # No text layer: try OCR
+        text, words = _ocr_page(page), []
+    else:
+        words = [{k: word[k] for k in _WORD_KEYS} for word in page.extract_words()]
+    ms = round((time.perf_counter() - started) * 1000, 2)
+    return ExtractedPage(number, text, words, float(page.width), float(page.height), ocr, ms)
+
+
+def _extract_page_range(path: str, first: int, last: int):
+    """
+    Extract pages ``first``..``last`` (1-based, inclusive); runs in a worker
+    process. Returns the pages and the worker's OCR stats.
+    """
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        pages = [extract_page(pdf.pages[number - 1], number) for number in range(first, last + 1)]
+    return pages, ocr_stats()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+# Latest OCR stats reported by each page pool worker, by pid
+_pool_ocr_stats = {}
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_page_pool():
+    """Stop the page extraction workers."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def extraction_ocr_stats() -> dict:
+    """
+    This process's OCR stats, with those of its page pool workers (as of
+    the last range each extracted) under ``page_workers``; module-level so
+    worker pools can call it.
+    """
+    with _pool_lock:
+        page_workers = list(_pool_ocr_stats.values())
+    return dict(ocr_stats(), page_workers=page_workers)
+
+
+def _page_ranges(count: int, workers: int):
+    # Two ranges per worker, so one slow (OCR) range does not hold the rest
+    size = max(-(-count // (workers * 2)), 1)
+    return [(first, min(first + size - 1, count)) for first in range(1, count + 1, size)]
+
+
+def extract_document(
+    path: str,
+    workers: Optional[int] = None,
+    max_pages: Optional[int] = None
+) -> ExtractedDocument:
+    """
+    Extract every page of ``path`` (or the first ``max_pages``).
+
+    With ``workers`` > 0, documents of at least RESUME_EXTRACT_MIN_PAGES
+    pages are extracted in parallel on a process pool; pages come back
+    in document order either way.
+    """
+    import pdfplumber
+
+    workers = EXTRACT_WORKERS if workers is None else workers
+    max_pages = EXTRACT_MAX_PAGES if max_pages is None else max_pages
+
+    with pdfplumber.open(path) as pdf:
+        total = len(pdf.pages)
+        count = min(total, max_pages) if max_pages > 0 else total
+        if workers <= 0 or count < max(EXTRACT_MIN_PAGES, 2):
+            pages = [extract_page(pdf.pages[number - 1], number) for number in range(1, count + 1)]
+            return ExtractedDocument(path, pages, total)
+
+    # map() yields in submission order, so the pages stay in document order
+    ranges = _page_ranges(count, workers)
+    chunks = _get_pool(workers).map(
+        _extract_page_range,
+        [path] * len(ranges),
+        [first for first, _ in ranges],
+        [last for _, last in ranges]
+    )
+    pages = []
+    for chunk, stats in chunks:
+        pages.extend(chunk)
+        with _pool_lock:
+            _pool_ocr_stats[stats["pid"]] = stats
+    return ExtractedDocument(path, pages, total)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compiled Jinja2 Template Cache
+
+Keeps a process-wide, size-bounded LRU of compiled Jinja2 templates keyed by
+a digest of the template source bytes, so rendering the same uploaded
+template twice only costs the ``template.render`` call.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import jinja2
+
+DEFAULT_MAX_TEMPLATES = int(os.environ.get("RESUME_TEMPLATE_CACHE_SIZE", "64"))
+
+
+def template_digest(template_bytes: bytes) -> str:
+    """Return the cache key for a template's source bytes."""
+    return hashlib.sha256(template_bytes).hexdigest()
+
+
+class TemplateCache:
+    """
+    Thread-safe LRU cache of compiled ``jinja2.Template`` objects.
+
+    All templates share a single ``jinja2.Environment`` so Jinja's own
+    lexer/parser caches are reused too.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_TEMPLATES, environment: jinja2.Environment = None):
+        self.max_size = max_size
+        self.environment = environment or jinja2.Environment(
+            loader=jinja2.BaseLoader(),
+            autoescape=True
+        )
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, template_bytes: bytes) -> jinja2.Template:
+        """Return the compiled template for ``template_bytes``, compiling on a miss."""
+        key = template_digest(template_bytes)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        # Compile outside the lock; a concurrent miss for the same key just
+        # compiles twice and the last writer wins.
+        template = self.environment.from_string(template_bytes.decode('utf-8'))
+        self.put(key, template)
+        return template
+
+    def put(self, key: str, template: jinja2.Template):
+        """Insert an already-compiled template under ``key``."""
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached templates and reset the counters."""
+        with self._lock:
+            self._templates.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            return {
+                "size": len(self._templates),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide cache used by render_html
+template_cache = TemplateCache()
+
+
+def get_template(template_bytes: bytes) -> jinja2.Template:
+    """Return a compiled template from the process-wide cache."""
+    return template_cache.get(template_bytes)
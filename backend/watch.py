@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Watch Mode with Incremental Rebuilds
+
+Tracks which input files every output depends on (base YAML, overlay,
+template plus any Jinja ``include``/``extends``/``import`` targets, CSS) and
+polls them for changes. When a file changes only the outputs that depend on
+it are rebuilt; parsed YAML, merge plans and compiled templates are reused
+from the in-process caches for everything that did not change.
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import jinja2
+from jinja2 import meta
+
+from backend.data_cache import data_cache
+from backend.render_resume import inject_css, load_resume_data
+
+
+class BuildTarget(NamedTuple):
+    """One rendered output and the inputs it is built from."""
+    base: str
+    template: str
+    html_output: str
+    overlay: Optional[str] = None
+    css: Optional[str] = None
+    pdf_output: Optional[str] = None
+
+
+def template_dependencies(template_file: str) -> Set[str]:
+    """
+    Return the template file plus every template it transitively references.
+
+    References are resolved relative to the template's directory, matching the
+    FileSystemLoader used to render it. Dynamic names that cannot be resolved
+    statically are ignored.
+    """
+    template_file = os.path.abspath(template_file)
+    search_dir = os.path.dirname(template_file)
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(search_dir))
+    found = set()
+    pending = [template_file]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(path):
+            continue
+        found.add(path)
+        with open(path, 'r') as f:
+            source = f.read()
+        try:
+            ast = env.parse(source)
+        except jinja2.TemplateSyntaxError:
+            # Still watch the file so fixing the syntax error triggers a rebuild
+            continue
+        for name in meta.find_referenced_templates(ast):
+            if name:
+                pending.append(os.path.join(search_dir, name))
+    return found
+
+
+class DependencyGraph:
+    """Maps input files to the build targets that depend on them."""
+
+    def __init__(self, targets: Iterable[BuildTarget]):
+        self.targets = list(targets)
+        self._deps: Dict[BuildTarget, Set[str]] = {}
+        for target in self.targets:
+            self.refresh(target)
+
+    def refresh(self, target: BuildTarget):
+        """Recompute a target's dependencies (templates may gain includes)."""
+        deps = {os.path.abspath(target.base)}
+        deps |= template_dependencies(target.template)
+        if target.overlay:
+            deps.add(os.path.abspath(target.overlay))
+        if target.css:
+            deps.add(os.path.abspath(target.css))
+        self._deps[target] = deps
+
+    def dependencies(self, target: BuildTarget) -> Set[str]:
+        return self._deps[target]
+
+    def files(self) -> Set[str]:
+        """All input files any target depends on."""
+        return set().union(*self._deps.values()) if self._deps else set()
+
+    def affected(self, changed: Set[str]) -> List[BuildTarget]:
+        """Targets that depend on at least one of the changed files."""
+        return [t for t in self.targets if self._deps[t] & changed]
+
+
+class Watcher:
+    """
+    Polls a dependency graph's inputs and rebuilds affected targets.
+    """
+
+    def __init__(self, targets: Iterable[BuildTarget], interval: float = 0.5):
+        self.graph = DependencyGraph(targets)
+        self.interval = interval
+        self._mtimes: Dict[str, Optional[int]] = {}
+        self._environments: Dict[str, jinja2.Environment] = {}
+        self._html_digests: Dict[BuildTarget, str] = {}
+
+    def _environment(self, template_dir: str) -> jinja2.Environment:
+        # One environment per directory; auto_reload recompiles a template only
+        # when it or one of its includes changed on disk
+        env = self._environments.get(template_dir)
+        if env is None:
+            env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(template_dir),
+                autoescape=True,
+                auto_reload=True
+            )
+            self._environments[template_dir] = env
+        return env
+
+    def build(self, target: BuildTarget):
+        """Render one target to HTML, and to PDF when it has a PDF output."""
+        started = time.perf_counter()
+        with open(target.base, 'rb') as f:
+            base_bytes = f.read()
+        overlay_bytes = None
+        if target.overlay:
+            with open(target.overlay, 'rb') as f:
+                overlay_bytes = f.read()
+        css_bytes = None
+        if target.css:
+            with open(target.css, 'rb') as f:
+                css_bytes = f.read()
+
+        data = data_cache.get(base_bytes, overlay_bytes, load_resume_data)
+        tpl_path = os.path.abspath(target.template)
+        env = self._environment(os.path.dirname(tpl_path))
+        html = env.get_template(os.path.basename(tpl_path)).render(resume=data)
+        if css_bytes:
+            html = inject_css(html, css_bytes)
+
+        digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        outputs = [target.html_output] + ([target.pdf_output] if target.pdf_output else [])
+        if digest == self._html_digests.get(target) and all(os.path.exists(o) for o in outputs):
+            print(f"Unchanged {target.html_output}")
+            return
+        self._html_digests[target] = digest
+
+        with open(target.html_output, 'w') as f:
+            f.write(html)
+        message = f"Rebuilt {target.html_output}"
+
+        if target.pdf_output:
+            # Imported lazily so HTML-only watches never load WeasyPrint
+            from backend.html_to_pdf import html_to_pdf
+
+            css_content = css_bytes.decode('utf-8', errors='ignore') if css_bytes else None
+            html_to_pdf(html, css_content=css_content, target=target.pdf_output)
+            message += f" and {target.pdf_output}"
+
+        print(f"{message} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _build_safely(self, target: BuildTarget):
+        try:
+            self.build(target)
+        except Exception as e:
+            print(f"Error building {target.html_output}: {type(e).__name__}: {e}")
+
+    def _snapshot(self) -> Dict[str, Optional[int]]:
+        mtimes = {}
+        for path in self.graph.files():
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtimes[path] = None
+        return mtimes
+
+    def poll(self) -> Set[str]:
+        """Return the input files whose modification time changed since the last poll."""
+        current = self._snapshot()
+        changed = {
+            path for path, mtime in current.items()
+            if self._mtimes.get(path, mtime) != mtime
+        }
+        self._mtimes.update(current)
+        return changed
+
+    def run(self):
+        """Build everything once, then rebuild affected targets until interrupted."""
+        for target in self.graph.targets:
+            self._build_safely(target)
+        self._mtimes = self._snapshot()
+        print(f"Watching {len(self._mtimes)} file(s) for {len(self.graph.targets)} output(s); Ctrl+C to stop")
+
+        try:
+            while True:
+                time.sleep(self.interval)
+                changed = self.poll()
+                if not changed:
+                    continue
+                for path in sorted(changed):
+                    print(f"Changed: {os.path.relpath(path)}")
+                for target in self.graph.affected(changed):
+                    self.graph.refresh(target)
+                    self._build_safely(target)
+                # Newly referenced includes must be picked up by the next poll
+                self._mtimes = {**self._snapshot(), **self._mtimes}
+        except KeyboardInterrupt:
+            print("Stopped watching")
+
+
+def watch(targets: Iterable[BuildTarget], interval: float = 0.5):
+    """Build ``targets`` and keep rebuilding them as their inputs change."""
+    Watcher(targets, interval).run()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Start-up benchmark for the API server
+
+Measures how long a fresh interpreter takes to import backend.main and how
+much memory it holds afterwards, for each deployment profile
+(RESUME_API_PROFILE). The "eager" row also loads the parsing stack (spaCy,
+PyResParser, pdfplumber) the way every worker did when it was imported at
+module load, which shows what lazy loading saves.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per measurement
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import backend.main
+if sys.argv[1] == "eager":
+    from backend.extract_parse_pipeline import load_parsing_stack
+    load_parsing_stack()
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+}))
+"""
+
+# (label, RESUME_API_PROFILE, load the parsing stack eagerly)
+SCENARIOS = [
+    ("render", "render", False),
+    ("full (lazy)", "full", False),
+    ("eager", "full", True),
+]
+
+
+def measure(profile: str, eager: bool) -> dict:
+    env = dict(os.environ, RESUME_API_PROFILE=profile)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, "eager" if eager else "lazy"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark API start-up time and memory per profile')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per scenario (median is reported)')
+    args = parser.parse_args()
+
+    print(f"{'scenario':<14} {'import s':>9} {'max RSS MB':>11} {'modules':>8}")
+    for label, profile, eager in SCENARIOS:
+        try:
+            samples = [measure(profile, eager) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{label:<14} failed: {e}")
+            continue
+        print(
+            f"{label:<14} "
+            f"{statistics.median(s['seconds'] for s in samples):>9.2f} "
+            f"{statistics.median(s['max_rss_mb'] for s in samples):>11.1f} "
+            f"{statistics.median(s['modules'] for s in samples):>8.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Merge plan equivalence check
+
+Compares backend.render_resume.merge_dict, which now compiles the overlay
+into a MergePlan, against the recursive merge_dict it replaced: lists
+append when selected by ``_append``, scalars replace, nested dicts recurse
+when selected by ``_merge``, and keys keep their order. Each case is
+checked through merge_dict, through a cached plan applied to the frozen
+base, and for leaving the base unmodified.
+
+Usage:
+    python scripts/check_merge_plan.py [--base test_files/sokolowski.yaml]
+"""
+import argparse
+import copy
+import os
+import sys
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from backend.data_cache import freeze, thaw
+from backend.merge_plan import get_merge_plan
+from backend.render_resume import merge_dict
+
+# Overlays from test_files applied to the base
+OVERLAY_FILES = ["test_files/overlay.yaml", "test_files/hashi.yaml"]
+
+# (label, base, overlay) cases for the control keys the test files do not use
+SYNTHETIC_CASES = [
+    (
+        "scalars replace, new keys append at the end",
+        {"name": "A", "title": "Dev", "tags": ["x"]},
+        {"title": "Lead", "email": "a@example.com"},
+    ),
+    (
+        "lists replace without _append",
+        {"skills": ["a", "b"], "meta": {"items": [1]}},
+        {"skills": ["c"], "meta": {"items": [2]}},
+    ),
+    (
+        "_append list selects fields, inherited by nested dicts",
+        {"skills": ["a"], "other": ["x"], "meta": {"skills": [1], "other": [2]}},
+        {"_append": ["skills"], "skills": ["b"], "other": ["y"], "meta": {"skills": [3], "other": [4]}},
+    ),
+    (
+        "_merge list replaces unselected dicts",
+        {"contact": {"email": "a", "phone": "1"}, "meta": {"a": 1, "b": 2}},
+        {"_merge": ["contact"], "contact": {"email": "b"}, "meta": {"a": 3}},
+    ),
+    (
+        "nested control keys override the parent's",
+        {"a": {"l": [1], "b": {"l": [2]}}},
+        {"_append": True, "a": {"l": [3], "b": {"_append": False, "l": [4]}}},
+    ),
+    (
+        "type changes replace",
+        {"a": [1], "b": {"x": 1}, "c": "s"},
+        {"_append": True, "a": {"x": 2}, "b": [2], "c": ["t"]},
+    ),
+]
+
+
+def reference_merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
+    """The recursive merge_dict that MergePlan replaced, kept verbatim as the oracle."""
+    append_mode = b.get('_append', parent_append_mode if parent_append_mode is not None else False)
+    merge_mode = b.get('_merge', parent_merge_mode if parent_merge_mode is not None else True)
+
+    merged = dict(a)
+
+    for k, v in b.items():
+        if k.startswith('_'):
+            continue
+
+        if k in a:
+            if isinstance(a[k], dict) and isinstance(v, dict):
+                should_merge = (
+                    merge_mode is True or
+                    (isinstance(merge_mode, list) and k in merge_mode) or
+                    (isinstance(merge_mode, dict) and k in merge_mode)
+                )
+                if should_merge:
+                    merged[k] = reference_merge_dict(a[k], v, append_mode, merge_mode)
+                else:
+                    merged[k] = v
+            elif isinstance(a[k], list) and isinstance(v, list):
+                should_append = (
+                    append_mode is True or
+                    (isinstance(append_mode, list) and k in append_mode) or
+                    (isinstance(append_mode, dict) and k in append_mode)
+                )
+                if should_append:
+                    merged[k] = list(a[k]) + v
+                else:
+                    merged[k] = v
+            else:
+                merged[k] = v
+        else:
+            merged[k] = v
+
+    return merged
+
+
+def differences(expected, actual, path="$"):
+    """List the paths where ``actual`` differs from ``expected``, including dict key order."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if list(expected) != list(actual):
+            return [f"{path}: keys {list(expected)} != {list(actual)}"]
+        found = []
+        for key in expected:
+            found.extend(differences(expected[key], actual[key], f"{path}.{key}"))
+        return found
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: {len(expected)} items != {len(actual)}"]
+        found = []
+        for index, (e, a) in enumerate(zip(expected, actual)):
+            found.extend(differences(e, a, f"{path}[{index}]"))
+        return found
+    if type(expected) is not type(actual) or expected != actual:
+        return [f"{path}: {expected!r} != {actual!r}"]
+    return []
+
+
+def check(label: str, base: dict, overlay: dict, overlay_bytes: bytes = None) -> list:
+    """Return the differences between the reference and the plan-based merges."""
+    base_before = copy.deepcopy(base)
+    expected = reference_merge_dict(base, overlay)
+
+    problems = [f"merge_dict: {d}" for d in differences(expected, thaw(merge_dict(base, overlay)))]
+    if overlay_bytes is None:
+        overlay_bytes = yaml.safe_dump(overlay, sort_keys=False).encode("utf-8")
+    frozen = thaw(get_merge_plan(overlay_bytes).apply(freeze(base)))
+    problems += [f"cached plan on frozen base: {d}" for d in differences(expected, frozen)]
+    problems += [f"base modified: {d}" for d in differences(base_before, base)]
+
+    status = "ok" if not problems else f"FAILED ({len(problems)})"
+    print(f"{label:<60} {status}")
+    for problem in problems[:10]:
+        print(f"    {problem}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check merge plans against the recursive merge_dict')
+    parser.add_argument('--base', default='test_files/sokolowski.yaml', help='Base resume YAML')
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, args.base), 'rb') as f:
+        base = yaml.safe_load(f.read())
+
+    failed = 0
+    for overlay_file in OVERLAY_FILES:
+        with open(os.path.join(REPO_ROOT, overlay_file), 'rb') as f:
+            overlay_bytes = f.read()
+        overlay = yaml.safe_load(overlay_bytes)
+        failed += bool(check(f"{args.base} + {overlay_file}", base, overlay, overlay_bytes))
+    for label, case_base, case_overlay in SYNTHETIC_CASES:
+        failed += bool(check(label, case_base, case_overlay))
+
+    if failed:
+        print(f"{failed} case(s) differ from the recursive merge_dict")
+        sys.exit(1)
+    print("All merge plans match the recursive merge_dict")
+
+
+if __name__ == '__main__':
+    main()
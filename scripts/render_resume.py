@@ -6,7 +6,7 @@ import sys
 import os
 
 def merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
-    """Simple recursive merge with Helm-like append control.
+    """Recursive, non-mutating merge with Helm-like append control.
     
     Special keys in the overlay dict:
     - '_append': Controls which fields should append instead of replace
@@ -26,11 +26,18 @@ def merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
     _append: [highlights, skill]
     _merge: [metadata]
     ```
+
+    Neither ``a`` nor ``b`` is modified. A new tree is returned in which every
+    subtree the overlay does not touch is shared with ``a``, so one parsed
+    base can be reused for any number of overlays without copying it.
     """
     # Extract control flags - use parent flags if none defined at this level
     append_mode = b.get('_append', parent_append_mode if parent_append_mode is not None else False)
     merge_mode = b.get('_merge', parent_merge_mode if parent_merge_mode is not None else True)
     
+    # Shallow copy of this level only; untouched values stay shared with a
+    merged = dict(a)
+    
     for k, v in b.items():
         # Skip special control keys
         if k.startswith('_'):
@@ -48,10 +55,10 @@ def merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
                 
                 if should_merge:
                     # Recursive merge with the same control flags
-                    merge_dict(a[k], v, append_mode, merge_mode)
+                    merged[k] = merge_dict(a[k], v, append_mode, merge_mode)
                 else:
                     # Replace the dict entirely
-                    a[k] = v
+                    merged[k] = v
             
             # Handle lists - append or replace
             elif isinstance(a[k], list) and isinstance(v, list):
@@ -63,20 +70,20 @@ def merge_dict(a, b, parent_append_mode=None, parent_merge_mode=None):
                 )
                 
                 if should_append:
-                    # Append items to the existing list
-                    a[k].extend(v)
+                    # New list with the overlay items after the existing ones
+                    merged[k] = list(a[k]) + v
                 else:
                     # Replace the list entirely
-                    a[k] = v
+                    merged[k] = v
                     
             else:
                 # For non-dict, non-list values, just replace
-                a[k] = v
+                merged[k] = v
         else:
             # Key doesn't exist in a, just add it
-            a[k] = v
+            merged[k] = v
     
-    return a
+    return merged
 
 def render_html(
     base_yaml_bytes: bytes,
@@ -95,7 +102,7 @@ def render_html(
     # Merge overlay if provided
     if overlay_yaml_bytes:
         overlay = yaml.safe_load(overlay_yaml_bytes)
-        merge_dict(data, overlay)
+        data = merge_dict(data, overlay)
 
     # Prepare Jinja2 template
     if template_bytes:
@@ -29,6 +29,11 @@ except ImportError as e:
     print("  python -m nltk.downloader punkt stopwords")
     sys.exit(1)
 
+# Add the parent directory to the path so we can import the backend module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.nlp_batch import pipe_docs
+
 # Download necessary NLTK data if not already downloaded
 try:
     nltk.data.find('tokenizers/punkt')
@@ -237,9 +242,6 @@ def extract_job_description_skills(text):
     Extract skills and requirements from a job description.
     Returns a list of extracted skills/keywords.
     """
-    # Process with spaCy
-    doc = nlp(text)
-    
     # Extract technical skills and tools
     tech_patterns = [
         r'\b(?:java|python|c\+\+|javascript|html|css|sql|react|node|php|ruby|go|swift|kotlin)\b',
@@ -253,15 +255,14 @@ def extract_job_description_skills(text):
     
     skills = set()
     
-    # Extract from bullet points first
-    for point in bullet_points:
+    # Extract from bullet points first; spaCy processes them as one batch
+    for point, point_doc in zip(bullet_points, pipe_docs(nlp, bullet_points)):
         # Apply patterns to extract technical terms
         for pattern in tech_patterns:
             matches = re.findall(pattern, point.lower())
             skills.update(matches)
         
         # Add noun phrases that might be skills
-        point_doc = nlp(point)
         for chunk in point_doc.noun_chunks:
             if 2 <= len(chunk.text.split()) <= 3:  # Most skills are 1-3 words
                 skills.add(chunk.text.lower())